@@ -0,0 +1,570 @@
+"""异步服务模式：与 data.py 共用模型、校验规则和查询语句，通过 aiosqlite 异步访问数据库。
+
+运行方式：uvicorn asgi:app --workers 4
+依赖 starlette 与 aiosqlite；数据库结构仍由 flask --app data migrate 维护。
+多个 worker 时设置 METRICS_DIR（启动前清空），/metrics 才会汇总全部 worker 的指标。
+与 gunicorn 运行的 data.py 同时部署时，反向代理把 /events 转发到本服务，大量空闲订阅连接只占用协程而不占用
+gunicorn 的线程；data.py 侧设置 EVENTS_URL=/events 让页面订阅（配置示例见 data.py 的实时推送一节）。
+"""
+import asyncio
+import functools
+from contextlib import asynccontextmanager
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from data import (
+    DATA_ITEM_FIELDS, EVENTS_KEEPALIVE, EVENTS_RESET, GET_DATA_ITEM_KEYS, GET_DATA_ITEM_STMT, ITEM_DATA_ITEMS_STMT,
+    ITEM_DETAIL_FIELDS, ITEM_DETAIL_STMT, ITEM_EXISTS_STMT, ITEM_FIELDS, ITEM_INCLUDES, ITEMS_STMT, LIST_ITEMS_STMT,
+    PATCH_RULES, REQUEST_STATS, STREAM_BATCH_SIZE, DataItem, Item, RequestStats, apply_data_item_changes,
+    admission_budget, apply_item_changes, app as flask_app, broker, configure_sqlite_engine, data_item_hits, data_item_search_stmt,
+    data_item_values, data_items_in_stmt, db, group_data_items, event_cursor, facet_stmt, facet_summary,
+    insert_items, is_file_sqlite, logger, merge_data_items, metrics, offset_arg, page_args, parse_projection,
+    overloaded_body, overloaded_headers, patch_changes, record_request, refresh_search_index, report_admission, rows_to_dicts, search_criteria, sse_headers,
+    validate_data_item, validate_item, versioned_update_stmt, wants_stream
+)
+
+# 与 Flask 应用相同的数据库文件，写连接池单连接，读连接池独立
+with flask_app.app_context():
+    DATABASE_URL = db.engine.url.set(drivername='sqlite+aiosqlite')
+
+if is_file_sqlite(DATABASE_URL):
+    connect_args = {'timeout': flask_app.config['SQLITE_BUSY_TIMEOUT']}
+    read_pool_size = flask_app.config['SQLITE_READ_POOL_SIZE']
+    writer_engine = create_async_engine(DATABASE_URL, pool_size=1, max_overflow=0,
+                                        pool_timeout=flask_app.config['SQLITE_WRITE_POOL_TIMEOUT'],
+                                        connect_args=connect_args)
+    reader_engine = create_async_engine(DATABASE_URL, pool_size=read_pool_size, max_overflow=read_pool_size,
+                                        connect_args=connect_args)
+    configure_sqlite_engine(writer_engine.sync_engine, read_only=False)
+    configure_sqlite_engine(reader_engine.sync_engine, read_only=True)
+else:
+    writer_engine = reader_engine = create_async_engine(DATABASE_URL)
+
+WriteSession = async_sessionmaker(writer_engine, expire_on_commit=False)
+ReadSession = async_sessionmaker(reader_engine)
+
+
+class FastJSONResponse(JSONResponse):
+    """与 Flask 应用使用同一个 JSON 编码器"""
+    def render(self, content):
+        return flask_app.json.dumps(content).encode('utf-8')
+
+
+def error_response(e, status_code=500):
+    return FastJSONResponse({'error': str(e)}, status_code=status_code)
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def rows_with_children(session, projection, rows):
+    items = rows_to_dicts(projection.keys, rows)
+    if projection.with_data_items and items:
+        result = await session.execute(data_items_in_stmt([item['id'] for item in items]))
+        merge_data_items(items, group_data_items(result))
+    return items
+
+
+async def paginate(projection, args):
+    """按 id 做键集分页，返回值与 Flask 版 paginate 相同"""
+    after_id, limit = page_args(args)
+    stmt = projection.stmt if after_id is None else projection.stmt.where(Item.id > after_id)
+    async with ReadSession() as session:
+        rows = (await session.execute(stmt.order_by(Item.id).limit(limit + 1))).all()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        items = await rows_with_children(session, projection, rows[:limit])
+    return FastJSONResponse({'items': items, 'next': next_cursor})
+
+
+async def paginate_ranked(projection, args):
+    _, limit = page_args(args)
+    offset = offset_arg(args)
+    async with ReadSession() as session:
+        rows = (await session.execute(projection.stmt.offset(offset).limit(limit + 1))).all()
+        next_offset = offset + limit if len(rows) > limit else None
+        items = await rows_with_children(session, projection, rows[:limit])
+    return FastJSONResponse({'items': items, 'next': next_offset})
+
+
+def stream_ndjson(projection, args):
+    after_id, _ = page_args(args)
+
+    async def generate():
+        last_id = after_id
+        async with ReadSession() as session:
+            while True:
+                stmt = projection.stmt if last_id is None else projection.stmt.where(Item.id > last_id)
+                rows = (await session.execute(stmt.order_by(Item.id).limit(STREAM_BATCH_SIZE))).all()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                items = await rows_with_children(session, projection, rows)
+                yield ''.join(flask_app.json.dumps(item) + '\n' for item in items)
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+
+async def list_items(projection, args):
+    if wants_stream(args):
+        return stream_ndjson(projection, args)
+    return await paginate(projection, args)
+
+
+# 主数据(Item)路由
+async def get_all_items(request):
+    """分页获取主数据项"""
+    try:
+        args = request.query_params
+        projection, error = parse_projection(LIST_ITEMS_STMT, ITEM_FIELDS + ('data_items_count',), args=args)
+        if error:
+            return error_response(error, 400)
+        return await list_items(projection, args)
+    except Exception as e:
+        logger.exception('get_all_items failed')
+        return error_response(e)
+
+
+async def search_items(request):
+    """检索主数据项，参数与 Flask 版 /items/search 相同"""
+    try:
+        args = request.query_params
+        filters, hits = search_criteria(args)
+        projection, error = parse_projection(ITEMS_STMT, ITEM_FIELDS, args=args)
+        if error:
+            return error_response(error, 400)
+        projection = projection._replace(stmt=projection.stmt.where(*filters))
+        if hits is not None:
+            projection = projection._replace(stmt=projection.stmt.join(hits, Item.id == hits.c.item_id))
+            if not wants_stream(args):
+                return await paginate_ranked(projection._replace(stmt=projection.stmt.order_by(hits.c.rank, Item.id)), args)
+        return await list_items(projection, args)
+    except Exception as e:
+        logger.exception('search_items failed')
+        return error_response(e)
+
+
+async def get_item_facets(request):
+    """分面统计，参数与 Flask 版 /items/facets 相同"""
+    try:
+        async with ReadSession() as session:
+            rows = (await session.execute(facet_stmt(request.query_params))).all()
+        return FastJSONResponse(facet_summary(rows))
+    except Exception as e:
+        logger.exception('get_item_facets failed')
+        return error_response(e)
+
+
+async def get_item(request):
+    """获取单个主数据项详情"""
+    try:
+        item_id = request.path_params['item_id']
+        projection, error = parse_projection(ITEM_DETAIL_STMT, ITEM_DETAIL_FIELDS, default_include=ITEM_INCLUDES,
+                                             args=request.query_params)
+        if error:
+            return error_response(error, 400)
+        async with ReadSession() as session:
+            row = (await session.execute(projection.stmt.where(Item.id == bindparam('item_id')),
+                                         {'item_id': item_id})).first()
+            if row is None:
+                return error_response('item not found', 404)
+            item = dict(zip(projection.keys, row))
+            if projection.with_data_items:
+                result = await session.execute(ITEM_DATA_ITEMS_STMT, {'item_id': item_id})
+                item['data_items'] = rows_to_dicts(DATA_ITEM_FIELDS, result)
+        return FastJSONResponse(item)
+    except Exception as e:
+        logger.exception('get_item failed')
+        return error_response(e)
+
+
+async def create_item(request):
+    """创建主数据项，可在 data_items 中同时提交其数据项"""
+    try:
+        data = await read_json(request)
+        error = validate_item(data)
+        if error:
+            return error_response(error, 400)
+        async with WriteSession() as session:
+            [(item_id, data_item_ids)] = await session.run_sync(
+                lambda sync_session: insert_items(sync_session.connection(), [data]))
+            await session.commit()
+        logger.info('item created', extra={'fields': {'item_id': item_id}})
+        return FastJSONResponse({'id': item_id, 'status': 'created', 'data_items_count': len(data_item_ids)},
+                                status_code=201)
+    except Exception as e:
+        logger.exception('create_item failed')
+        return error_response(e)
+
+
+async def update_item(request):
+    """更新主数据项"""
+    try:
+        item_id = request.path_params['item_id']
+        data = await read_json(request)
+        if not isinstance(data, dict):
+            return error_response('request body must be a JSON object', 400)
+        async with WriteSession() as session:
+            item = await session.get(Item, item_id)
+            if item is None:
+                return error_response('item not found', 404)
+            apply_item_changes(item, data)
+            await session.commit()
+        logger.info('item updated', extra={'fields': {'item_id': item_id}})
+        return FastJSONResponse({'status': 'updated', 'item_id': item_id})
+    except Exception as e:
+        logger.exception('update_item failed')
+        return error_response(e)
+
+
+async def patch_row(model, row_id, request):
+    """与 Flask 版 patch_row 相同：返回 (新版本号, None) 或 (None, 错误响应)"""
+    changes, version, error = patch_changes(model, await read_json(request))
+    if error:
+        return None, error_response(error, 400)
+    async with WriteSession() as session:
+        row = (await session.execute(versioned_update_stmt(model, row_id, version, changes))).first()
+        if row is None:
+            current = (await session.execute(select(model.version).where(model.id == row_id))).scalar()
+            await session.rollback()
+            if current is None:
+                return None, error_response(f'{model.__table__.name} not found', 404)
+            return None, FastJSONResponse({'error': 'version conflict', 'version': current}, status_code=409)
+        if PATCH_RULES[model][2] & changes.keys():
+            await session.run_sync(lambda sync_session: refresh_search_index(sync_session.connection(), [row[1]]))
+        await session.commit()
+    return row[0], None
+
+
+async def patch_item(request):
+    """部分更新主数据项，规则同 Flask 版 PATCH /items/<id>"""
+    try:
+        item_id = request.path_params['item_id']
+        version, error = await patch_row(Item, item_id, request)
+        if error:
+            return error
+        return FastJSONResponse({'status': 'updated', 'item_id': item_id, 'version': version})
+    except Exception as e:
+        logger.exception('patch_item failed')
+        return error_response(e)
+
+
+async def delete_item(request):
+    """删除主数据项"""
+    try:
+        item_id = request.path_params['item_id']
+        async with WriteSession() as session:
+            # 数据项由数据库 ON DELETE CASCADE 删除，无需加载
+            item = await session.get(Item, item_id)
+            if item is None:
+                return error_response('item not found', 404)
+            await session.delete(item)
+            await session.commit()
+        logger.info('item deleted', extra={'fields': {'item_id': item_id}})
+        return FastJSONResponse({'status': 'deleted', 'item_id': item_id})
+    except Exception as e:
+        logger.exception('delete_item failed')
+        return error_response(e)
+
+
+# 数据项(DataItem)路由
+async def get_all_data_items(request):
+    """获取某个主数据项的所有数据项"""
+    try:
+        item_id = request.path_params['item_id']
+        async with ReadSession() as session:
+            if (await session.execute(ITEM_EXISTS_STMT, {'item_id': item_id})).first() is None:
+                return error_response('item not found', 404)
+            result = await session.execute(ITEM_DATA_ITEMS_STMT, {'item_id': item_id})
+            return FastJSONResponse(rows_to_dicts(DATA_ITEM_FIELDS, result))
+    except Exception as e:
+        logger.exception('get_all_data_items failed')
+        return error_response(e)
+
+
+async def create_data_item(request):
+    """为某个主数据项创建数据项"""
+    try:
+        item_id = request.path_params['item_id']
+        data = await read_json(request)
+        error = validate_data_item(data)
+        if error:
+            return error_response(error, 400)
+        async with WriteSession() as session:
+            if (await session.execute(ITEM_EXISTS_STMT, {'item_id': item_id})).first() is None:
+                return error_response('item not found', 404)
+            data_item = DataItem(**data_item_values(data, item_id))
+            session.add(data_item)
+            await session.commit()
+        return FastJSONResponse({'id': data_item.id, 'item_id': item_id, 'status': 'created'}, status_code=201)
+    except Exception as e:
+        logger.exception('create_data_item failed')
+        return error_response(e)
+
+
+async def search_data_items(request):
+    """全目录检索数据项，参数与 Flask 版 /data-items/search 相同"""
+    try:
+        args = request.query_params
+        stmt, error = data_item_search_stmt(args)
+        if error:
+            return error_response(error, 400)
+        _, limit = page_args(args)
+        offset = offset_arg(args)
+        async with ReadSession() as session:
+            rows = (await session.execute(stmt.offset(offset).limit(limit + 1))).all()
+        next_offset = offset + limit if len(rows) > limit else None
+        return FastJSONResponse({'data_items': data_item_hits(rows[:limit]), 'next': next_offset})
+    except Exception as e:
+        logger.exception('search_data_items failed')
+        return error_response(e)
+
+
+async def get_data_item(request):
+    """获取单个数据项详情"""
+    try:
+        data_item_id = request.path_params['data_item_id']
+        async with ReadSession() as session:
+            row = (await session.execute(GET_DATA_ITEM_STMT, {'data_item_id': data_item_id})).first()
+        if row is None:
+            return error_response('data item not found', 404)
+        return FastJSONResponse(dict(zip(GET_DATA_ITEM_KEYS, row)))
+    except Exception as e:
+        logger.exception('get_data_item failed')
+        return error_response(e)
+
+
+async def update_data_item(request):
+    """更新数据项"""
+    try:
+        data_item_id = request.path_params['data_item_id']
+        data = await read_json(request)
+        if not isinstance(data, dict):
+            return error_response('request body must be a JSON object', 400)
+        async with WriteSession() as session:
+            data_item = await session.get(DataItem, data_item_id)
+            if data_item is None:
+                return error_response('data item not found', 404)
+            apply_data_item_changes(data_item, data)
+            await session.commit()
+        return FastJSONResponse({'status': 'updated', 'data_item_id': data_item_id})
+    except Exception as e:
+        logger.exception('update_data_item failed')
+        return error_response(e)
+
+
+async def patch_data_item(request):
+    """部分更新数据项"""
+    try:
+        data_item_id = request.path_params['data_item_id']
+        version, error = await patch_row(DataItem, data_item_id, request)
+        if error:
+            return error
+        return FastJSONResponse({'status': 'updated', 'data_item_id': data_item_id, 'version': version})
+    except Exception as e:
+        logger.exception('patch_data_item failed')
+        return error_response(e)
+
+
+async def delete_data_item(request):
+    """删除数据项"""
+    try:
+        data_item_id = request.path_params['data_item_id']
+        async with WriteSession() as session:
+            data_item = await session.get(DataItem, data_item_id)
+            if data_item is None:
+                return error_response('data item not found', 404)
+            await session.delete(data_item)
+            await session.commit()
+        return FastJSONResponse({'status': 'deleted', 'data_item_id': data_item_id})
+    except Exception as e:
+        logger.exception('delete_data_item failed')
+        return error_response(e)
+
+
+async def events(request):
+    """SSE 推送，消息格式同 Flask 版 /events；每个连接一个协程，由 broker 线程通过事件循环唤醒"""
+    cursor = broker.subscribe(event_cursor(request.headers, request.query_params))
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+
+    def listener():
+        loop.call_soon_threadsafe(wake.set)
+
+    async def generate(cursor):
+        broker.add_listener(listener)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                wake.clear()
+                messages, cursor = broker.read(cursor)
+                if messages is None:
+                    yield EVENTS_RESET
+                elif messages:
+                    yield ''.join(messages)
+                else:
+                    try:
+                        await asyncio.wait_for(wake.wait(), EVENTS_KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        yield ': keepalive\n\n'
+        finally:
+            broker.remove_listener(listener)
+
+    return StreamingResponse(generate(cursor), media_type='text/event-stream', headers=sse_headers())
+
+
+async def metrics_endpoint(request):
+    """Prometheus 抓取接口，与 Flask 版共用同一份指标，设置 METRICS_DIR 时汇总全部 worker"""
+    return PlainTextResponse(metrics.render(flask_app.config['METRICS_DIR']), media_type='text/plain; version=0.0.4')
+
+
+class InstrumentationMiddleware:
+    """为每个 HTTP 请求记录延迟与 SQL 统计，流式响应在输出结束后记录"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        stats = RequestStats('unmatched', scope['method'])
+        token = REQUEST_STATS.set(stats)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_STATS.reset(token)
+            route = scope.get('route')
+            if route is not None:
+                stats.route = route.path
+            record_request(stats, status)
+
+
+class AsyncAdmissionLimiter:
+    """data.AdmissionLimiter 的协程版本：排队的请求只占用一个协程，预算与指标相同"""
+    def __init__(self, name, limit, queue):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.condition = asyncio.Condition()
+        self.active = 0
+        self.waiting = 0
+
+    async def acquire(self, timeout):
+        labels = (('budget', self.name),)
+        async with self.condition:
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                return None
+            if self.waiting >= self.queue:
+                metrics.inc('admission_rejected_total', labels + (('reason', 'queue_full'),))
+                return 'queue_full'
+            metrics.inc('admission_queued_total', labels)
+            self.waiting += 1
+            started = asyncio.get_running_loop().time()
+            try:
+                await asyncio.wait_for(self.condition.wait_for(lambda: self.active < self.limit), timeout)
+            except asyncio.TimeoutError:
+                self.condition.notify()
+                metrics.inc('admission_rejected_total', labels + (('reason', 'timeout'),))
+                return 'timeout'
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            metrics.observe('admission_wait_seconds', labels, asyncio.get_running_loop().time() - started)
+            return None
+
+    async def release(self):
+        async with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+
+ADMISSION_LIMITERS = {}
+metrics.collectors.append(lambda: report_admission(ADMISSION_LIMITERS.values()))
+
+
+async def release_after(body_iterator, limiter):
+    """流式响应输出结束后才释放名额"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        await limiter.release()
+
+
+def admitted(endpoint):
+    """按 data.admission_budget 的规则做准入控制，预算名称取路由函数名（与 Flask 的 endpoint 相同）"""
+    @functools.wraps(endpoint)
+    async def wrapper(request):
+        budget = admission_budget(endpoint.__name__, request.method)
+        if budget is None:
+            return await endpoint(request)
+        limiter = ADMISSION_LIMITERS.get(budget[0])
+        if limiter is None:
+            limiter = ADMISSION_LIMITERS.setdefault(budget[0], AsyncAdmissionLimiter(*budget))
+        if await limiter.acquire(flask_app.config['ADMISSION_QUEUE_TIMEOUT']) is not None:
+            return FastJSONResponse(overloaded_body(), status_code=503, headers=overloaded_headers())
+        try:
+            response = await endpoint(request)
+        except BaseException:
+            await limiter.release()
+            raise
+        if isinstance(response, StreamingResponse):
+            response.body_iterator = release_after(response.body_iterator, limiter)
+        else:
+            await limiter.release()
+        return response
+    return wrapper
+
+
+@asynccontextmanager
+async def lifespan(app):
+    metrics_dir = flask_app.config['METRICS_DIR']
+    if metrics_dir:
+        metrics.start_flusher(metrics_dir, flask_app.config['METRICS_FLUSH_INTERVAL'])
+    yield
+    if metrics_dir:
+        metrics.stop_flusher(metrics_dir)
+    await writer_engine.dispose()
+    if reader_engine is not writer_engine:
+        await reader_engine.dispose()
+
+
+app = Starlette(routes=[
+    Route('/items', admitted(get_all_items), methods=['GET']),
+    Route('/items', admitted(create_item), methods=['POST']),
+    Route('/items/search', admitted(search_items), methods=['GET']),
+    Route('/items/facets', admitted(get_item_facets), methods=['GET']),
+    Route('/items/{item_id:int}', admitted(get_item), methods=['GET']),
+    Route('/items/{item_id:int}', admitted(update_item), methods=['PUT']),
+    Route('/items/{item_id:int}', admitted(patch_item), methods=['PATCH']),
+    Route('/items/{item_id:int}', admitted(delete_item), methods=['DELETE']),
+    Route('/items/{item_id:int}/data-items', admitted(get_all_data_items), methods=['GET']),
+    Route('/items/{item_id:int}/data-items', admitted(create_data_item), methods=['POST']),
+    Route('/data-items/search', admitted(search_data_items), methods=['GET']),
+    Route('/data-items/{data_item_id:int}', admitted(get_data_item), methods=['GET']),
+    Route('/data-items/{data_item_id:int}', admitted(update_data_item), methods=['PUT']),
+    Route('/data-items/{data_item_id:int}', admitted(patch_data_item), methods=['PATCH']),
+    Route('/data-items/{data_item_id:int}', admitted(delete_data_item), methods=['DELETE']),
+    Route('/events', events, methods=['GET']),
+    Route('/metrics', metrics_endpoint, methods=['GET']),
+], middleware=[
+    Middleware(InstrumentationMiddleware),
+    Middleware(GZipMiddleware, minimum_size=flask_app.config['COMPRESS_MIN_SIZE']),
+], lifespan=lifespan)
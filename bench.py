@@ -0,0 +1,272 @@
+"""基准与压测：在临时 SQLite 库中生成 N 个主数据项 × M 个数据项，按固定并发逐个压测各路由，
+输出每个路由的 p50/p95/p99 延迟、吞吐量与每请求 SQL 语句数（JSON）。
+
+    python bench.py --items 2000 --data-items 10 --concurrency 8 --save-baseline bench-baseline.json
+    python bench.py --baseline bench-baseline.json   # 任一路由退化超过阈值时以状态码 1 退出
+
+压测前先检查分面统计与检索结果是否一致（FACET_CHECK_QUERIES），不一致时同样以状态码 1 退出。
+
+请求在进程内经 Flask 测试客户端发出，不经过网络与服务器，结果只反映应用与数据库的开销。
+每请求 SQL 语句数取自 data.metrics 的统计，与数据规模和机器无关，平均增加 0.5 条以上即视为退化
+（多为 N+1 查询）；延迟按 p95 比较，允许 --tolerance 的浮动。
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 必须在导入 data 之前指定数据库，data 在导入时按 DATABASE_URL 创建引擎
+SCRATCH_DIR = tempfile.mkdtemp(prefix='data-bench-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(SCRATCH_DIR, 'bench.db')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from data import app, db, insert_items, metrics, migrate, snapshot  # noqa: E402
+
+NAME_WORDS = ('人口', '经济', '气象', '交通', '教育', '医疗', 'census', 'traffic', 'weather', 'budget')
+LABEL_WORDS = ('编号', '名称', '日期', '金额', '地区', 'code', 'name', 'date', 'amount', 'region')
+STATUSES = ('active', 'inactive', 'draft')
+SEED_BATCH_SIZE = 1000
+QUERY_REGRESSION = 0.5
+SNAPSHOT_LOAD_TIMEOUT = 120
+# 分面与检索一致性检查的条件，含只有标点、无法检索的全文输入
+FACET_CHECK_QUERIES = ('', 'status=active', 'status=active&data_sources_code=DS000001', 'q=人口', 'q=人口&status=draft',
+                       'q=!!!', 'q=!!!&status=active', 'abstracts=%%%')
+
+
+def seed(items, data_items, rng):
+    """批量写入测试数据，返回全部主数据项 id"""
+    item_ids = []
+    with app.app_context():
+        migrate()
+        for start in range(0, items, SEED_BATCH_SIZE):
+            records = [{
+                'data_sources_name': f'{rng.choice(NAME_WORDS)}{rng.choice(NAME_WORDS)}数据{index}',
+                'data_sources_code': f'DS{index:06d}',
+                'abstracts': ' '.join(rng.sample(NAME_WORDS, 3)),
+                'status': rng.choice(STATUSES),
+                'data_items': [{
+                    'field_label_zh': f'{rng.choice(LABEL_WORDS)}{child}',
+                    'field_label_en': f'{rng.choice(LABEL_WORDS)}_{child}',
+                    'field_type': 'text'
+                } for child in range(data_items)]
+            } for index in range(start, min(start + SEED_BATCH_SIZE, items))]
+            with db.engine.begin() as conn:
+                item_ids.extend(item_id for item_id, _ in insert_items(conn, records))
+    return item_ids
+
+
+def scenarios(item_ids, rng):
+    """(名称, 路由规则, 请求生成函数) 列表，按顺序执行；数据项的增删改查共用 created 中的 id"""
+    created = []
+    lock = threading.Lock()
+
+    def pick():
+        return rng.choice(item_ids)
+
+    def create_data_item(client):
+        response = client.post(f'/items/{pick()}/data-items',
+                               json={'field_label_zh': '基准', 'field_label_en': 'bench', 'field_type': 'text'})
+        if response.status_code == 201:
+            with lock:
+                created.append(response.get_json()['id'])
+        return response
+
+    def created_id(remove=False):
+        with lock:
+            if not created:
+                return 0
+            return created.pop() if remove else rng.choice(created)
+
+    return [
+        ('list_items', '/items', lambda client: client.get('/items')),
+        ('list_items_include', '/items', lambda client: client.get('/items?include=data_items&limit=50')),
+        ('search_filter', '/items/search', lambda client: client.get(f'/items/search?status={rng.choice(STATUSES)}')),
+        ('search_text', '/items/search', lambda client: client.get(f'/items/search?q={rng.choice(NAME_WORDS)}')),
+        ('item_facets', '/items/facets', lambda client: client.get('/items/facets')),
+        ('item_facets_search', '/items/facets', lambda client: client.get(f'/items/facets?q={rng.choice(NAME_WORDS)}')),
+        ('get_item', '/items/<int:item_id>', lambda client: client.get(f'/items/{pick()}')),
+        ('view_item_page', '/items/view/<int:item_id>', lambda client: client.get(f'/items/view/{pick()}')),
+        ('list_data_items', '/items/<int:item_id>/data-items', lambda client: client.get(f'/items/{pick()}/data-items')),
+        ('create_data_item', '/items/<int:item_id>/data-items', create_data_item),
+        ('search_data_items', '/data-items/search',
+         lambda client: client.get(f'/data-items/search?q={rng.choice(LABEL_WORDS)}&limit=20')),
+        ('get_data_item', '/data-items/<int:data_item_id>', lambda client: client.get(f'/data-items/{created_id()}')),
+        ('update_data_item', '/data-items/<int:data_item_id>',
+         lambda client: client.put(f'/data-items/{created_id()}', json={'field_type': 'number'})),
+        ('delete_data_item', '/data-items/<int:data_item_id>',
+         lambda client: client.delete(f'/data-items/{created_id(remove=True)}')),
+    ]
+
+
+def wait_for_snapshot():
+    """快照由后台线程加载，压测前等待其可用，否则先执行的路由会回退到 SQL"""
+    deadline = time.monotonic() + SNAPSHOT_LOAD_TIMEOUT
+    while not snapshot.fresh():
+        if time.monotonic() > deadline:
+            raise SystemExit('catalog snapshot did not load')
+        time.sleep(0.05)
+
+
+def check_facets():
+    """同样的条件下 /items/facets 统计的主数据项数必须等于 /items/search 返回的结果数，返回不一致的说明列表"""
+    client = app.test_client()
+    mismatches = []
+    for query in FACET_CHECK_QUERIES:
+        counted = client.get(f'/items/facets?{query}').get_json()['items']
+        body = client.get(f'/items/search?{query}&stream=1&fields=id').get_data(as_text=True)
+        found = sum(1 for line in body.splitlines() if line)
+        if counted != found:
+            mismatches.append(f'facets?{query}: {counted} items, search returned {found}')
+    return mismatches
+
+def statement_totals(route):
+    """data.metrics 中该路由累计的 (SQL 语句数, 请求数)"""
+    with metrics.lock:
+        histogram = metrics.histograms.get(('db_statements_per_request', (('route', route),)))
+        return (histogram[2], histogram[1]) if histogram else (0, 0)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(route, send, requests, concurrency, warmup):
+    local = threading.local()
+
+    def timed(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        started = time.perf_counter()
+        response = send(client)
+        elapsed = time.perf_counter() - started
+        return elapsed, response.status_code < 400
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(timed, range(warmup)))
+        statements_before, count_before = statement_totals(route)
+        started = time.perf_counter()
+        results = list(pool.map(timed, range(requests)))
+        wall = time.perf_counter() - started
+    statements, count = statement_totals(route)
+    latencies = sorted(elapsed * 1000 for elapsed, _ in results)
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, ok in results if not ok),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'throughput_rps': round(requests / wall, 1),
+        'queries_per_request': round((statements - statements_before) / max(count - count_before, 1), 2)
+    }
+
+
+def compare(results, baseline, tolerance):
+    """与基线比较，返回退化说明列表"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('routes', {}).get(name)
+        if previous is None:
+            continue
+        if current['errors'] > previous.get('errors', 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+        if current['queries_per_request'] - previous['queries_per_request'] >= QUERY_REGRESSION:
+            regressions.append(f"{name}: queries/request {previous['queries_per_request']} -> "
+                               f"{current['queries_per_request']}")
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='路由基准与压测')
+    parser.add_argument('--items', type=int, default=2000, help='主数据项数量')
+    parser.add_argument('--data-items', type=int, default=10, help='每个主数据项的数据项数量')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='每个路由的请求数')
+    parser.add_argument('--warmup', type=int, default=20, help='每个路由不计入结果的预热请求数')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--snapshot', action='store_true', help='启用内存快照（CATALOG_SNAPSHOT）')
+    parser.add_argument('--admission', action='store_true',
+                        help='启用准入控制（ADMISSION_CONTROL），超出预算的请求以 503 计入错误')
+    parser.add_argument('--route', action='append', help='只压测指定名称的路由，可重复')
+    parser.add_argument('--output', help='结果写入文件，默认输出到标准输出')
+    parser.add_argument('--baseline', help='与该基线文件比较，存在退化时以状态码 1 退出')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='p95 延迟允许超出基线的比例')
+    parser.add_argument('--save-baseline', help='把本次结果保存为基线文件')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    app.config['CATALOG_SNAPSHOT'] = args.snapshot
+    app.config['ADMISSION_CONTROL'] = args.admission
+    rng = random.Random(args.seed)
+    try:
+        started = time.perf_counter()
+        item_ids = seed(args.items, args.data_items, rng)
+        seed_seconds = time.perf_counter() - started
+        if args.snapshot:
+            wait_for_snapshot()
+        inconsistencies = check_facets()
+        results = {}
+        for name, route, send in scenarios(item_ids, rng):
+            if args.route and name not in args.route:
+                continue
+            results[name] = run_scenario(route, send, args.requests, args.concurrency, args.warmup)
+    finally:
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    report = {
+        'config': {
+            'items': args.items,
+            'data_items': args.data_items,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'seed': args.seed,
+            'snapshot': args.snapshot,
+            'admission': args.admission,
+            'seed_seconds': round(seed_seconds, 2)
+        },
+        'routes': results
+    }
+    if inconsistencies:
+        report['inconsistencies'] = inconsistencies
+    if baseline is not None:
+        report['regressions'] = compare(results, baseline, args.tolerance)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'config': report['config'], 'routes': results}, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+    for inconsistency in inconsistencies:
+        print('INCONSISTENT', inconsistency, file=sys.stderr)
+    if report.get('regressions'):
+        for regression in report['regressions']:
+            print('REGRESSION', regression, file=sys.stderr)
+        return 1
+    return 1 if inconsistencies else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
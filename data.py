@@ -1,776 +1,3370 @@
-from flask import Flask, request, jsonify, render_template_string
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import inspect
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///crud.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
-
-# 数据模型定义
-class Item(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    data_sources_name = db.Column(db.String(100), nullable=False)
-    data_sources_code = db.Column(db.String(100), nullable=False)
-    abstracts = db.Column(db.String(100))
-    data_range = db.Column(db.String(50))
-    frequency_of_updates = db.Column(db.String(50))
-    sources_format = db.Column(db.String(50))
-    field = db.Column(db.String(50))
-    status = db.Column(db.String(10))
-    visible_range = db.Column(db.String(20))
-    data_items = db.relationship('DataItem', backref='item', lazy=True, cascade="all, delete-orphan")
-
-class DataItem(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
-    field_label_zh = db.Column(db.String(100))
-    field_label_en = db.Column(db.String(100))
-    field_type = db.Column(db.String(100))
-
-# 主页面HTML模板
-INDEX_HTML = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>数据管理</title>
-    <style>
-        body { font-family: Arial; max-width: 1200px; margin: 0 auto; padding: 20px; }
-        input, button { padding: 8px; margin: 5px 0; }
-        .input-container { display: flex; flex-wrap: wrap; gap: 10px; margin-bottom: 20px; }
-        table { width: 100%; border-collapse: collapse; margin-top: 20px; }
-        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
-        th { background-color: #f2f2f2; }
-        button { cursor: pointer; background-color: #007bff; color: white; border: none; padding: 5px 10px; border-radius: 3px; }
-        button:hover { background-color: #0056b3; }
-        .action-buttons { display: flex; gap: 5px; }
-        .edit-form { display: none; margin-top: 10px; padding: 10px; background: #f5f5f5; border-radius: 5px; }
-    </style>
-</head>
-<body>
-    <h2>数据管理</h2>
-    <div class="input-container">
-        <input id="data_sources_name" placeholder="数据资源名称" maxlength="100">
-        <input id="data_sources_code" placeholder="数据资源代码" maxlength="100">
-        <input id="abstracts" placeholder="摘要信息" maxlength="100">
-        <input id="data_range" placeholder="数据范围" maxlength="50">
-        <input id="frequency_of_updates" placeholder="更新频率" maxlength="50">
-        <input id="sources_format" placeholder="资源格式" maxlength="50">
-        <input id="status" placeholder="状态" maxlength="10">
-        <input id="field" placeholder="所属领域" maxlength="50">
-        <input id="visible_range" placeholder="可见状态" maxlength="20">
-        <button onclick="saveItem()">保存</button>
-        <button onclick="searchItem()">搜索</button>
-    </div>
-    <table id="items">
-        <tr>
-            <th>序号</th>
-            <th>数据资源名称</th>
-            <th>数据资源代码</th>
-            <th>摘要信息</th>
-            <th>数据范围</th>
-            <th>更新频率</th>
-            <th>资源格式</th>
-            <th>状态</th>
-            <th>所属领域</th>
-            <th>可见范围</th>
-            <th>操作</th>
-        </tr>
-    </table>
-    <script>
-        let currentEditId = null;
-
-        // 加载页面时获取所有数据
-        function loadItems() {
-            fetch('/items')
-                .then(response => response.json())
-                .then(data => {
-                    const table = document.getElementById('items');
-                    table.innerHTML = '<tr><th>序号</th><th>数据资源名称</th><th>数据资源代码</th><th>摘要信息</th><th>数据范围</th><th>更新频率</th><th>资源格式</th><th>状态</th><th>所属领域</th><th>可见范围</th><th>操作</th></tr>';
-                    data.forEach((item, index) => {
-                        const row = table.insertRow();
-                        row.innerHTML = `
-                            <td>${index + 1}</td>
-                            <td>${item.data_sources_name}</td>
-                            <td>${item.data_sources_code}</td>
-                            <td>${item.abstracts || '--'}</td>
-                            <td>${item.data_range || '--'}</td>
-                            <td>${item.frequency_of_updates || '--'}</td>
-                            <td>${item.sources_format || '--'}</td>
-                            <td>${item.status || '--'}</td>
-                            <td>${item.field || '--'}</td>
-                            <td>${item.visible_range || '--'}</td>
-                            <td class="action-buttons">
-                                <button onclick="viewItem(${item.id})">查看</button>
-                                <button onclick="editItem(${item.id})">编辑</button>
-                                <button onclick="deleteItem(${item.id})">删除</button>
-                            </td>
-                        `;
-                        // 添加编辑表单
-                        const editRow = table.insertRow();
-                        editRow.id = `edit-form-${item.id}`;
-                        editRow.className = 'edit-form';
-                        editRow.innerHTML = `
-                            <td colspan="11">
-                                <input id="edit_data_sources_name_${item.id}" value="${item.data_sources_name}" maxlength="100">
-                                <input id="edit_data_sources_code_${item.id}" value="${item.data_sources_code}" maxlength="100">
-                                <input id="edit_abstracts_${item.id}" value="${item.abstracts || ''}" maxlength="100">
-                                <input id="edit_data_range_${item.id}" value="${item.data_range || ''}" maxlength="50">
-                                <input id="edit_frequency_of_updates_${item.id}" value="${item.frequency_of_updates || ''}" maxlength="50">
-                                <input id="edit_sources_format_${item.id}" value="${item.sources_format || ''}" maxlength="50">
-                                <input id="edit_status_${item.id}" value="${item.status || ''}" maxlength="10">
-                                <input id="edit_field_${item.id}" value="${item.field || ''}" maxlength="50">
-                                <input id="edit_visible_range_${item.id}" value="${item.visible_range || ''}" maxlength="20">
-                                <button onclick="updateItem(${item.id})">保存</button>
-                                <button onclick="hideEditForm(${item.id})">取消</button>
-                            </td>
-                        `;
-                    });
-                })
-                .catch(error => console.error('加载数据失败:', error));
-        }
-
-        // 保存数据
-        function saveItem() {
-            const data = {
-                data_sources_name: document.getElementById('data_sources_name').value,
-                data_sources_code: document.getElementById('data_sources_code').value,
-                abstracts: document.getElementById('abstracts').value,
-                data_range: document.getElementById('data_range').value,
-                frequency_of_updates: document.getElementById('frequency_of_updates').value,
-                sources_format: document.getElementById('sources_format').value,
-                status: document.getElementById('status').value,
-                field: document.getElementById('field').value,
-                visible_range: document.getElementById('visible_range').value
-            };
-
-            fetch('/items', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify(data)
-            })
-            .then(response => {
-                if (!response.ok) {
-                    return response.json().then(err => { throw new Error(err.error || '保存失败'); });
-                }
-                return response.json();
-            })
-            .then(data => {
-                alert('保存成功');
-                loadItems(); // 重新加载数据
-                document.querySelectorAll('.input-container input').forEach(input => input.value = '');
-            })
-            .catch(error => {
-                console.error('保存错误:', error);
-                alert('保存失败: ' + error.message);
-            });
-        }
-
-        // 搜索数据
-        function searchItem() {
-            const params = new URLSearchParams();
-            const fields = ['data_sources_name', 'data_sources_code', 'abstracts', 'data_range', 
-                          'frequency_of_updates', 'sources_format', 'status', 'field', 'visible_range'];
-
-            fields.forEach(field => {
-                const value = document.getElementById(field).value;
-                if (value) params.append(field, value);
-            });
-
-            fetch(`/items/search?${params.toString()}`)
-                .then(response => response.json())
-                .then(data => {
-                    const table = document.getElementById('items');
-                    table.innerHTML = '<tr><th>序号</th><th>数据资源名称</th><th>数据资源代码</th><th>摘要信息</th><th>数据范围</th><th>更新频率</th><th>资源格式</th><th>状态</th><th>所属领域</th><th>可见范围</th><th>操作</th></tr>';
-                    data.forEach((item, index) => {
-                        const row = table.insertRow();
-                        row.innerHTML = `
-                            <td>${index + 1}</td>
-                            <td>${item.data_sources_name}</td>
-                            <td>${item.data_sources_code}</td>
-                            <td>${item.abstracts || '--'}</td>
-                            <td>${item.data_range || '--'}</td>
-                            <td>${item.frequency_of_updates || '--'}</td>
-                            <td>${item.sources_format || '--'}</td>
-                            <td>${item.status || '--'}</td>
-                            <td>${item.field || '--'}</td>
-                            <td>${item.visible_range || '--'}</td>
-                            <td class="action-buttons">
-                                <button onclick="viewItem(${item.id})">查看</button>
-                                <button onclick="editItem(${item.id})">编辑</button>
-                                <button onclick="deleteItem(${item.id})">删除</button>
-                            </td>
-                        `;
-                        const editRow = table.insertRow();
-                        editRow.id = `edit-form-${item.id}`;
-                        editRow.className = 'edit-form';
-                        editRow.innerHTML = `
-                            <td colspan="11">
-                                <input id="edit_data_sources_name_${item.id}" value="${item.data_sources_name}" maxlength="100">
-                                <input id="edit_data_sources_code_${item.id}" value="${item.data_sources_code}" maxlength="100">
-                                <input id="edit_abstracts_${item.id}" value="${item.abstracts || ''}" maxlength="100">
-                                <input id="edit_data_range_${item.id}" value="${item.data_range || ''}" maxlength="50">
-                                <input id="edit_frequency_of_updates_${item.id}" value="${item.frequency_of_updates || ''}" maxlength="50">
-                                <input id="edit_sources_format_${item.id}" value="${item.sources_format || ''}" maxlength="50">
-                                <input id="edit_status_${item.id}" value="${item.status || ''}" maxlength="10">
-                                <input id="edit_field_${item.id}" value="${item.field || ''}" maxlength="50">
-                                <input id="edit_visible_range_${item.id}" value="${item.visible_range || ''}" maxlength="20">
-                                <button onclick="updateItem(${item.id})">保存</button>
-                                <button onclick="hideEditForm(${item.id})">取消</button>
-                            </td>
-                        `;
-                    });
-                })
-                .catch(error => console.error('搜索失败:', error));
-        }
-
-        // 查看详情
-        function viewItem(id) {
-            window.location.href = `/items/view/${id}`;
-        }
-
-        // 编辑数据
-        function editItem(id) {
-            if (currentEditId && currentEditId !== id) {
-                hideEditForm(currentEditId);
-            }
-            document.getElementById(`edit-form-${id}`).style.display = 'block';
-            currentEditId = id;
-        }
-
-        // 隐藏编辑表单
-        function hideEditForm(id) {
-            document.getElementById(`edit-form-${id}`).style.display = 'none';
-            currentEditId = null;
-        }
-
-        // 更新数据
-        function updateItem(id) {
-            const data = {
-                data_sources_name: document.getElementById(`edit_data_sources_name_${id}`).value,
-                data_sources_code: document.getElementById(`edit_data_sources_code_${id}`).value,
-                abstracts: document.getElementById(`edit_abstracts_${id}`).value,
-                data_range: document.getElementById(`edit_data_range_${id}`).value,
-                frequency_of_updates: document.getElementById(`edit_frequency_of_updates_${id}`).value,
-                sources_format: document.getElementById(`edit_sources_format_${id}`).value,
-                status: document.getElementById(`edit_status_${id}`).value,
-                field: document.getElementById(`edit_field_${id}`).value,
-                visible_range: document.getElementById(`edit_visible_range_${id}`).value
-            };
-
-            fetch(`/items/${id}`, {
-                method: 'PUT',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify(data)
-            })
-            .then(response => {
-                if (!response.ok) {
-                    return response.json().then(err => { throw new Error(err.error || '更新失败'); });
-                }
-                return response.json();
-            })
-            .then(data => {
-                alert('更新成功');
-                hideEditForm(id);
-                loadItems();
-            })
-            .catch(error => {
-                console.error('更新错误:', error);
-                alert('更新失败: ' + error.message);
-            });
-        }
-
-        // 删除数据
-        function deleteItem(id) {
-            if (confirm('确定删除此项吗？')) {
-                fetch(`/items/${id}`, {
-                    method: 'DELETE'
-                })
-                .then(response => {
-                    if (!response.ok) {
-                        return response.json().then(err => { throw new Error(err.error || '删除失败'); });
-                    }
-                    return response.json();
-                })
-                .then(data => {
-                    alert('删除成功');
-                    loadItems();
-                })
-                .catch(error => {
-                    console.error('删除错误:', error);
-                    alert('删除失败: ' + error.message);
-                });
-            }
-        }
-
-        // 页面加载时调用
-        window.onload = loadItems;
-    </script>
-</body>
-</html>
-"""
-
-VIEW_HTML = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>数据详情</title>
-    <style>
-        body { font-family: Arial; max-width: 1200px; margin: 0 auto; padding: 20px; }
-        h2 { margin-bottom: 20px; }
-        .section { margin-bottom: 30px; }
-        .section-title { font-weight: bold; margin-bottom: 10px; }
-        .info-grid { display: grid; grid-template-columns: 1fr 1fr; gap: 10px; }
-        .info-item { display: flex; align-items: center; }
-        .info-item label { width: 120px; font-weight: bold; }
-        .info-item span { flex: 1; }
-        table { width: 100%; border-collapse: collapse; margin-top: 10px; }
-        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
-        th { background-color: #f2f2f2; }
-        button { padding: 8px 16px; background-color: #007bff; color: white; border: none; border-radius: 3px; cursor: pointer; }
-        button:hover { background-color: #0056b3; }
-        .data-item-form { display:none; margin:10px 0; background:#f5f5f5; padding:15px; border-radius:5px; }
-        .form-grid { display:grid; grid-template-columns:1fr 1fr; gap:10px; margin-bottom:10px; }
-        .form-actions { text-align:right; margin-top:10px; }
-    </style>
-</head>
-<body>
-    <h2>数据详情</h2>
-
-    <div class="section">
-        <div class="section-title">数据资源信息</div>
-        <div class="info-grid">
-            <div class="info-item">
-                <label>数据资源名称:</label>
-                <span>{{ item.data_sources_name }}</span>
-            </div>
-            <div class="info-item">
-                <label>数据资源代码:</label>
-                <span>{{ item.data_sources_code }}</span>
-            </div>
-            <div class="info-item">
-                <label>摘要信息:</label>
-                <span>{{ item.abstracts or '--' }}</span>
-            </div>
-            <div class="info-item">
-                <label>数据范围:</label>
-                <span>{{ item.data_range or '--' }}</span>
-            </div>
-            <div class="info-item">
-                <label>更新频率:</label>
-                <span>{{ item.frequency_of_updates or '--' }}</span>
-            </div>
-            <div class="info-item">
-                <label>资源格式:</label>
-                <span>{{ item.sources_format or '--' }}</span>
-            </div>
-            <div class="info-item">
-                <label>所属领域:</label>
-                <span>{{ item.field or '--' }}</span>
-            </div>
-            <div class="info-item">
-                <label>状态:</label>
-                <span>{{ item.status or '--' }}</span>
-            </div>
-            <div class="info-item">
-                <label>可见范围:</label>
-                <span>{{ item.visible_range or '--' }}</span>
-            </div>
-        </div>
-    </div>
-
-    <div class="section">
-        <div class="section-title">数据项管理
-            <button onclick="showDataItemForm()">添加数据项</button>
-        </div>
-
-        <div id="dataItemForm" class="data-item-form">
-            <div class="form-grid">
-                <div>
-                    <label>字段中文名:</label>
-                    <input id="di_label_zh" style="width:100%">
-                </div>
-                <div>
-                    <label>字段英文名:</label>
-                    <input id="di_label_en" style="width:100%">
-                </div>
-                <div>
-                    <label>字段类型:</label>
-                    <select id="di_type" style="width:100%">
-                        <option value="text">文本</option>
-                        <option value="number">数字</option>
-                        <option value="date">日期</option>
-                        <option value="boolean">布尔值</option>
-                    </select>
-                </div>
-            </div>
-            <div class="form-actions">
-                <button onclick="saveDataItem()">保存</button>
-                <button onclick="hideDataItemForm()">取消</button>
-            </div>
-        </div>
-
-        <table>
-            <tr>
-                <th>序号</th>
-                <th>字段中文名</th>
-                <th>字段英文名</th>
-                <th>类型</th>
-                <th>操作</th>
-            </tr>
-            {% for di in item.data_items %}
-            <tr>
-                <td>{{ loop.index }}</td>
-                <td>{{ di.field_label_zh or '--' }}</td>
-                <td>{{ di.field_label_en or '--' }}</td>
-                <td>{{ di.field_type or '--' }}</td>
-                <td>
-                    <button onclick="editDataItem({{ di.id }})">编辑</button>
-                    <button onclick="deleteDataItem({{ di.id }})">删除</button>
-                </td>
-            </tr>
-            {% else %}
-            <tr><td colspan="5" style="text-align:center;">暂无数据项</td></tr>
-            {% endfor %}
-        </table>
-    </div>
-
-    <button onclick="window.location.href='/'">返回</button>
-
-    <script>
-    let currentEditId = null;
-
-    function showDataItemForm() {
-        currentEditId = null;
-        document.getElementById('di_label_zh').value = '';
-        document.getElementById('di_label_en').value = '';
-        document.getElementById('di_type').value = 'text';
-        document.getElementById('dataItemForm').style.display = 'block';
-    }
-
-    function hideDataItemForm() {
-        document.getElementById('dataItemForm').style.display = 'none';
-    }
-
-    function saveDataItem() {
-        const itemId = {{ item.id }};
-        const url = currentEditId 
-            ? `/data-items/${currentEditId}` 
-            : `/items/${itemId}/data-items`;
-
-        const method = currentEditId ? 'PUT' : 'POST';
-
-        fetch(url, {
-            method: method,
-            headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify({
-                field_label_zh: document.getElementById('di_label_zh').value,
-                field_label_en: document.getElementById('di_label_en').value,
-                field_type: document.getElementById('di_type').value
-            })
-        }).then(response => {
-            if(response.ok) {
-                location.reload();
-            } else {
-                alert('操作失败');
-            }
-        }).catch(error => {
-            console.error('Error:', error);
-            alert('操作失败');
-        });
-    }
-
-    function editDataItem(id) {
-        fetch(`/data-items/${id}`)
-            .then(r => r.json())
-            .then(data => {
-                currentEditId = id;
-                document.getElementById('di_label_zh').value = data.field_label_zh || '';
-                document.getElementById('di_label_en').value = data.field_label_en || '';
-                document.getElementById('di_type').value = data.field_type || 'text';
-                document.getElementById('dataItemForm').style.display = 'block';
-            });
-    }
-
-    function deleteDataItem(id) {
-        if(confirm('确定删除此数据项？')) {
-            fetch(`/data-items/${id}`, {method: 'DELETE'})
-                .then(() => location.reload())
-                .catch(error => {
-                    console.error('Error:', error);
-                    alert('删除失败');
-                });
-        }
-    }
-    </script>
-</body>
-</html>
-"""
-
-# 主数据(Item)路由
-@app.route('/items', methods=['GET'])
-def get_all_items():
-    """获取所有主数据项"""
-    try:
-        items = Item.query.all()
-        return jsonify([{
-            'id': item.id,
-            'data_sources_name': item.data_sources_name,
-            'data_sources_code': item.data_sources_code,
-            'abstracts': item.abstracts,
-            'data_range': item.data_range,
-            'frequency_of_updates': item.frequency_of_updates,
-            'sources_format': item.sources_format,
-            'status': item.status,
-            'field': item.field,
-            'visible_range': item.visible_range,
-            'data_items_count': len(item.data_items)
-        } for item in items])
-    except Exception as e:
-        print(f"Error in get_all_items: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/items/search', methods=['GET'])
-def search_items():
-    try:
-        query = Item.query
-        filters = {
-            'data_sources_name': Item.data_sources_name == request.args.get('data_sources_name'),
-            'data_sources_code': Item.data_sources_code == request.args.get('data_sources_code'),
-            # 'abstracts': Item.abstracts == request.args.get('abstracts'),
-            # 'status': Item.status == request.args.get('status')
-        }
-
-        query = query.filter(*[cond for cond in filters.values() if cond.right.value is not None])
-
-        items = query.all()
-        return jsonify([{
-            'id': item.id,
-            'data_sources_name': item.data_sources_name,
-            'data_sources_code': item.data_sources_code,
-            'abstracts': item.abstracts,
-            'data_range': item.data_range,
-            'frequency_of_updates': item.frequency_of_updates,
-            'sources_format': item.sources_format,
-            'status': item.status,
-            'field': item.field,
-            'visible_range': item.visible_range
-        } for item in items])
-    except Exception as e:
-        print(f"Error in search_items: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/items/<int:item_id>', methods=['GET'])
-def get_item(item_id):
-    """获取单个主数据项详情"""
-    try:
-        item = Item.query.get_or_404(item_id)
-        return jsonify({
-            'id': item.id,
-            'data_sources_name': item.data_sources_name,
-            'data_sources_code': item.data_sources_code,
-            'abstracts': item.abstracts,
-            'data_range': item.data_range,
-            'frequency_of_updates': item.frequency_of_updates,
-            'sources_format': item.sources_format,
-            'status': item.status,
-            'field': item.field,
-            'visible_range': item.visible_range,
-            'data_items': [{
-                'id': di.id,
-                'field_label_zh': di.field_label_zh,
-                'field_label_en': di.field_label_en,
-                'field_type': di.field_type,
-            } for di in item.data_items]
-        })
-    except Exception as e:
-        print(f"Error in get_item: {str(e)}")
-        return jsonify({'error': str(e)}), 404
-
-@app.route('/items', methods=['POST'])
-def create_item():
-    """创建主数据项"""
-    try:
-        data = request.json
-        print(f"Received data: {data}")
-
-        if not data.get('data_sources_name'):
-            return jsonify({'error': 'data_sources_name is required'}), 400
-        if not data.get('data_sources_code'):
-            return jsonify({'error': 'data_sources_code is required'}), 400
-
-        item = Item(
-            data_sources_name=data['data_sources_name'],
-            data_sources_code=data['data_sources_code'],
-            abstracts=data.get('abstracts'),
-            data_range=data.get('data_range'),
-            frequency_of_updates=data.get('frequency_of_updates'),
-            sources_format=data.get('sources_format'),
-            status=data.get('status', 'active'),
-            field=data.get('field'),
-            visible_range=data.get('visible_range', 'public')
-        )
-        db.session.add(item)
-        db.session.commit()
-        print(f"Item saved with ID: {item.id}")
-
-        return jsonify({
-            'id': item.id,
-            'status': 'created',
-            'data_items_count': len(item.data_items)
-        }), 201
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error in create_item: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/items/<int:item_id>', methods=['PUT'])
-def update_item(item_id):
-    """更新主数据项"""
-    try:
-        item = Item.query.get_or_404(item_id)
-        data = request.json
-        print(f"Updating item {item_id} with data: {data}")
-
-        if 'data_sources_name' in data:
-            item.data_sources_name = data['data_sources_name']
-        if 'data_sources_code' in data:
-            item.data_sources_code = data['data_sources_code']
-        item.abstracts = data.get('abstracts', item.abstracts)
-        item.data_range = data.get('data_range', item.data_range)
-        item.frequency_of_updates = data.get('frequency_of_updates', item.frequency_of_updates)
-        item.sources_format = data.get('sources_format', item.sources_format)
-        item.status = data.get('status', item.status)
-        item.field = data.get('field', item.field)
-        item.visible_range = data.get('visible_range', item.visible_range)
-        db.session.commit()
-        print(f"Item {item_id} updated successfully")
-        return jsonify({'status': 'updated', 'item_id': item_id})
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error in update_item: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/items/<int:item_id>', methods=['DELETE'])
-def delete_item(item_id):
-    """删除主数据项"""
-    try:
-        item = Item.query.get_or_404(item_id)
-        db.session.delete(item)
-        db.session.commit()
-        print(f"Item {item_id} deleted successfully")
-        return jsonify({'status': 'deleted', 'item_id': item_id})
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error in delete_item: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-# 数据项(DataItem)路由
-@app.route('/items/<int:item_id>/data-items', methods=['GET'])
-def get_all_data_items(item_id):
-    """获取某个主数据项的所有数据项"""
-    try:
-        item = Item.query.get_or_404(item_id)
-        data_items = [{
-            'id': di.id,
-            'field_label_zh': di.field_label_zh,
-            'field_label_en': di.field_label_en,
-            'field_type': di.field_type,
-        } for di in item.data_items]
-        return jsonify(data_items)
-    except Exception as e:
-        print(f"Error in get_all_data_items: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/items/<int:item_id>/data-items', methods=['POST'])
-def create_data_item(item_id):
-    """为某个主数据项创建数据项"""
-    try:
-        item = Item.query.get_or_404(item_id)
-        data = request.json
-        if not data.get('field_label_zh'):
-            return jsonify({'error': 'field_label_zh is required'}), 400
-        data_item = DataItem(
-            field_label_zh=data['field_label_zh'],
-            field_label_en=data.get('field_label_en'),
-            field_type=data.get('field_type', 'text'),
-            item=item
-        )
-        db.session.add(data_item)
-        db.session.commit()
-        return jsonify({
-            'id': data_item.id,
-            'item_id': item_id,
-            'status': 'created'
-        }), 201
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error in create_data_item: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/data-items/<int:data_item_id>', methods=['GET'])
-def get_data_item(data_item_id):
-    """获取单个数据项详情"""
-    try:
-        data_item = DataItem.query.get_or_404(data_item_id)
-        return jsonify({
-            'id': data_item.id,
-            'item_id': data_item.item_id,
-            'field_label_zh': data_item.field_label_zh,
-            'field_label_en': data_item.field_label_en,
-            'field_type': data_item.field_type,
-        })
-    except Exception as e:
-        print(f"Error in get_data_item: {str(e)}")
-        return jsonify({'error': str(e)}), 404
-
-@app.route('/data-items/<int:data_item_id>', methods=['PUT'])
-def update_data_item(data_item_id):
-    """更新数据项"""
-    try:
-        data_item = DataItem.query.get_or_404(data_item_id)
-        data = request.json
-        if 'field_label_zh' in data:
-            data_item.field_label_zh = data['field_label_zh']
-        if 'field_label_en' in data:
-            data_item.field_label_en = data['field_label_en']
-        if 'field_type' in data:
-            data_item.field_type = data['field_type']
-        db.session.commit()
-        return jsonify({'status': 'updated', 'data_item_id': data_item_id})
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error in update_data_item: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/data-items/<int:data_item_id>', methods=['DELETE'])
-def delete_data_item(data_item_id):
-    """删除数据项"""
-    try:
-        data_item = DataItem.query.get_or_404(data_item_id)
-        db.session.delete(data_item)
-        db.session.commit()
-        return jsonify({'status': 'deleted', 'data_item_id': data_item_id})
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error in delete_data_item: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-# 前端页面路由
-@app.route('/')
-def index():
-    """前端主页面"""
-    return render_template_string(INDEX_HTML)
-
-@app.route('/items/view/<int:item_id>')
-def view_item_page(item_id):
-    """查看数据项详情页面"""
-    item = Item.query.get_or_404(item_id)
-    return render_template_string(VIEW_HTML, item=item)
-
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-        inspector = inspect(db.engine)
-        print("Database tables created:", inspector.get_table_names())
-    app.run(debug=True)
\ No newline at end of file
+import argparse
+import atexit
+import contextvars
+import csv
+import functools
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+from itertools import chain
+from logging.handlers import QueueHandler, QueueListener
+
+import click
+from flask import Flask, Response, abort, g, has_app_context, make_response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import bindparam, delete, event, false, func, insert, inspect, literal, or_, select, text, union_all, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, column_property, joinedload
+from werkzeug.exceptions import HTTPException
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用 Flask 默认的 JSON 编码
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只提供 gzip 压缩
+    brotli = None
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///crud.db')
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite 并发参数：busy_timeout（秒）、只读连接池大小、写连接的排队超时（秒）
+app.config['SQLITE_BUSY_TIMEOUT'] = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5))
+app.config['SQLITE_READ_POOL_SIZE'] = int(os.environ.get('SQLITE_READ_POOL_SIZE', 8))
+app.config['SQLITE_WRITE_POOL_TIMEOUT'] = float(os.environ.get('SQLITE_WRITE_POOL_TIMEOUT', 30))
+
+# 连接池：文件型 SQLite 使用单连接的写池（进程内写操作在池上排队，而不是在数据库锁上反复重试）
+# 和独立的只读池（WAL 模式下读不阻塞写）。只读池以 bind 'reader' 注册，由 RoutingSession 选择。
+READ_BIND = 'reader'
+
+def is_file_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+if is_file_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+    connect_args = {'timeout': app.config['SQLITE_BUSY_TIMEOUT'], 'check_same_thread': False}
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': 1,
+        'max_overflow': 0,
+        'pool_timeout': app.config['SQLITE_WRITE_POOL_TIMEOUT'],
+        'connect_args': connect_args
+    }
+    app.config['SQLALCHEMY_BINDS'] = {READ_BIND: {
+        'url': app.config['SQLALCHEMY_DATABASE_URI'],
+        'pool_size': app.config['SQLITE_READ_POOL_SIZE'],
+        'max_overflow': app.config['SQLITE_READ_POOL_SIZE'],
+        'connect_args': connect_args
+    }}
+
+class RoutingSession(FlaskSession):
+    """read_only 路由内的查询走只读连接池，flush 与其余请求走写连接池"""
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('db_read_only'):
+            engine = db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+def configure_sqlite_engine(engine, read_only):
+    """关闭 pysqlite 的隐式事务管理，自行发出 BEGIN：写连接使用 BEGIN IMMEDIATE，
+    一开始就取得写锁并在 busy_timeout 内排队，避免读锁升级为写锁时直接报 database is locked；
+    只读连接使用普通 BEGIN，请求内的多条查询读到同一快照"""
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys = ON')
+        if read_only:
+            cursor.execute('PRAGMA query_only = ON')
+        else:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('PRAGMA synchronous = NORMAL')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def on_begin(conn):
+        conn.exec_driver_sql('BEGIN' if read_only else 'BEGIN IMMEDIATE')
+
+def enable_foreign_keys(engine):
+    """SQLite 默认不检查外键，ON DELETE CASCADE 需要每个连接打开 foreign_keys"""
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys = ON')
+        cursor.close()
+
+with app.app_context():
+    if READ_BIND in db.engines:
+        configure_sqlite_engine(db.engine, read_only=False)
+        configure_sqlite_engine(db.engines[READ_BIND], read_only=True)
+    elif db.engine.dialect.name == 'sqlite':
+        enable_foreign_keys(db.engine)
+
+def read_only(view):
+    """标记只读路由：查询改走只读连接池"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+# 观测：结构化日志经 QueueHandler 交给后台线程输出，请求线程不做 I/O；每个请求统计 SQL 语句数与耗时，
+# 超过 SQL_QUERY_BUDGET 时记录警告（多为 N+1 查询）。指标在进程内存中累计，由 /metrics 以 Prometheus
+# 文本格式输出。多进程部署时各 worker 共用一个监听端口，一次抓取只落到其中一个进程，因此设置 METRICS_DIR
+# （或 PROMETHEUS_MULTIPROC_DIR）后每个进程每 METRICS_FLUSH_INTERVAL 秒把自己的指标写入该目录下的
+# <pid>.json，/metrics 先写出本进程的最新值，再汇总目录中所有进程的文件。python data.py 未指定目录时
+# 自动在临时目录中创建。
+app.config['SQL_QUERY_BUDGET'] = int(os.environ.get('SQL_QUERY_BUDGET', 20))
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR') or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+app.config['METRICS_FLUSH_INTERVAL'] = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+logger = logging.getLogger('data')
+
+class JsonLogFormatter(logging.Formatter):
+    """每条日志输出一行 JSON，extra={'fields': {...}} 中的字段并入顶层"""
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'msg': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(JsonLogFormatter())
+queue_handler = QueueHandler(queue.SimpleQueue())
+logger.addHandler(queue_handler)
+logger.setLevel(app.config['LOG_LEVEL'])
+logger.propagate = False
+log_listener = None
+
+def start_log_listener():
+    """启动写日志的后台线程；fork 后子进程没有该线程，需换用新队列重新启动"""
+    global log_listener
+    queue_handler.queue = queue.SimpleQueue()
+    log_listener = QueueListener(queue_handler.queue, log_handler)
+    log_listener.start()
+
+def stop_log_listener():
+    """输出队列中剩余的日志并停止后台线程"""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+start_log_listener()
+atexit.register(stop_log_listener)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+# 指标名 -> (类型, 说明, 直方图分桶)
+METRIC_SPECS = {
+    'http_requests_total': ('counter', 'HTTP requests by route, method and status', None),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by route and method', LATENCY_BUCKETS),
+    'db_statements_per_request': ('histogram', 'SQL statements executed per request', STATEMENT_BUCKETS),
+    'db_statement_seconds_total': ('counter', 'Time spent executing SQL statements', None),
+    'db_query_budget_exceeded_total': ('counter', 'Requests that executed more than SQL_QUERY_BUDGET statements', None),
+    'catalog_snapshot_reads_total': ('counter', 'Read requests by whether the in-memory snapshot could serve them', None),
+    'catalog_snapshot_rows': ('gauge', 'Rows held in the in-memory catalog snapshot', None),
+    'catalog_snapshot_bytes': ('gauge', 'Estimated memory used by the in-memory catalog snapshot', None),
+    'catalog_snapshot_age_seconds': ('gauge', 'Seconds since the in-memory catalog snapshot was last refreshed', None),
+    'admission_active': ('gauge', 'Requests currently holding a slot of an admission budget', None),
+    'admission_queue_depth': ('gauge', 'Requests currently waiting for a slot of an admission budget', None),
+    'admission_queued_total': ('counter', 'Requests that had to wait for a slot of an admission budget', None),
+    'admission_rejected_total': ('counter', 'Requests shed with 503 by admission control, by reason', None),
+    'admission_wait_seconds': ('histogram', 'Time queued requests waited before being admitted', LATENCY_BUCKETS)
+}
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    return '{%s}' % ','.join(f'{name}="{escape_label(value)}"' for name, value in labels)
+
+# 多进程汇总时计数器与直方图按标签求和，仪表默认求和，这里列出的按对应函数合并
+GAUGE_MERGE = {'catalog_snapshot_age_seconds': max}
+# 已退出 worker 的计数器与直方图由 gunicorn master 并入该文件，保证 worker 轮换或崩溃后计数器不回退；
+# 其仪表随之丢弃。retired 记录已并入的进程文件标识，汇总时跳过仍未删除的同一文件
+METRICS_EXITED_FILE = 'exited.json'
+
+def write_json_atomic(path, obj):
+    """先写临时文件再改名，读取方不会读到写了一半的文件"""
+    partial = f'{path}.{os.getpid()}.tmp'
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(obj, f)
+    os.replace(partial, path)
+
+def read_metrics_file(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def metric_key(name, labels):
+    return name, tuple(tuple(label) for label in labels)
+
+class Metrics:
+    """线程安全的计数器、仪表与直方图，labels 为 ((名称, 值), ...) 元组。
+    collectors 中的函数在输出前调用，用于更新按需计算的仪表"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.histograms = {}
+        self.collectors = []
+        # 本进程指标文件的标识，区分复用了同一 pid 的先后两个进程
+        self.file_id = None
+        self.flusher = None
+        self.stop_flushing = threading.Event()
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            self.values[name, labels] = self.values.get((name, labels), 0) + amount
+
+    def set(self, name, labels, value):
+        with self.lock:
+            self.values[name, labels] = value
+
+    def observe(self, name, labels, value):
+        buckets = METRIC_SPECS[name][2]
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[name, labels] = [[0] * len(buckets), 0, 0]
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram[0][index] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def collect(self):
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception('metrics collector failed')
+
+    def state(self, gauges=True):
+        """可写入 JSON 的当前值；gauges=False 时不含仪表（进程退出后其仪表不再有意义）"""
+        with self.lock:
+            return {
+                'id': self.file_id,
+                'values': [[name, labels, value] for (name, labels), value in self.values.items()
+                           if gauges or METRIC_SPECS[name][0] != 'gauge'],
+                'histograms': [[name, labels, counts[:], count, total]
+                               for (name, labels), (counts, count, total) in self.histograms.items()]
+            }
+
+    def flush(self, directory, gauges=True):
+        """把本进程的指标写入 <directory>/<pid>.json"""
+        if self.file_id is None or not self.file_id.startswith(f'{os.getpid()}-'):
+            self.file_id = f'{os.getpid()}-{time.time()}'
+        if gauges:
+            self.collect()
+        write_json_atomic(os.path.join(directory, f'{os.getpid()}.json'), self.state(gauges))
+
+    def start_flusher(self, directory, interval):
+        """fork 后在每个 worker 中启动定期写出指标的后台线程"""
+        self.file_id = None
+        self.stop_flushing = threading.Event()
+
+        def run():
+            while not self.stop_flushing.wait(interval):
+                try:
+                    self.flush(directory)
+                except OSError:
+                    logger.exception('metrics flush failed')
+
+        self.flusher = threading.Thread(target=run, name='metrics-flusher', daemon=True)
+        self.flusher.start()
+
+    def stop_flusher(self, directory):
+        """进程退出前最后写出一次，不含仪表"""
+        if self.flusher is None:
+            return
+        self.stop_flushing.set()
+        self.flusher.join()
+        self.flusher = None
+        self.flush(directory, gauges=False)
+
+    @staticmethod
+    def retire(directory, pid):
+        """master 在 worker 退出后调用：把其计数器与直方图并入 exited.json 并删除其文件。
+        先写 exited.json 再删除，期间的抓取按 retired 跳过该文件，不会重复计数"""
+        path = os.path.join(directory, f'{pid}.json')
+        state = read_metrics_file(path)
+        if state is None:
+            return
+        exited_path = os.path.join(directory, METRICS_EXITED_FILE)
+        exited = read_metrics_file(exited_path) or {'retired': [], 'values': [], 'histograms': []}
+        values, histograms = Metrics.merge([exited, {
+            'values': [entry for entry in state['values'] if METRIC_SPECS[entry[0]][0] != 'gauge'],
+            'histograms': state['histograms']
+        }])
+        exited['retired'].append(state['id'])
+        exited['values'] = [[name, labels, value] for (name, labels), value in values.items()]
+        exited['histograms'] = [[name, labels, *histogram] for (name, labels), histogram in histograms.items()]
+        write_json_atomic(exited_path, exited)
+        os.remove(path)
+
+    @staticmethod
+    def merge(states):
+        """合并多个进程的指标，返回与 values、histograms 同形的两个字典"""
+        values, gauges, histograms = {}, {}, {}
+        for state in states:
+            for name, labels, value in state['values']:
+                if name not in METRIC_SPECS:
+                    continue
+                key = metric_key(name, labels)
+                if METRIC_SPECS[name][0] == 'gauge':
+                    gauges.setdefault(key, []).append(value)
+                else:
+                    values[key] = values.get(key, 0) + value
+            for name, labels, counts, count, total in state['histograms']:
+                if name not in METRIC_SPECS:
+                    continue
+                key = metric_key(name, labels)
+                histogram = histograms.get(key)
+                if histogram is None or len(histogram[0]) != len(counts):
+                    histograms[key] = [list(counts), count, total]
+                    continue
+                histogram[0] = [a + b for a, b in zip(histogram[0], counts)]
+                histogram[1] += count
+                histogram[2] += total
+        for (name, labels), samples in gauges.items():
+            values[name, labels] = GAUGE_MERGE.get(name, sum)(samples)
+        return values, histograms
+
+    def gather(self, directory):
+        """写出本进程的最新值后汇总目录中全部进程的指标"""
+        self.flush(directory)
+        states = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.json') and entry.name != METRICS_EXITED_FILE:
+                state = read_metrics_file(entry.path)
+                if state is not None:
+                    states.append(state)
+        # 在读完进程文件之后读取：此时已删除的文件必然已并入
+        exited = read_metrics_file(os.path.join(directory, METRICS_EXITED_FILE))
+        if exited is not None:
+            retired = set(exited['retired'])
+            states = [state for state in states if state['id'] not in retired] + [exited]
+        return self.merge(states)
+
+    def render(self, directory=None):
+        """Prometheus 文本格式；指定 directory 时输出全部进程的汇总，否则输出本进程的值并带 pid 标签"""
+        if directory:
+            values, histograms = self.gather(directory)
+            extra = ()
+        else:
+            self.collect()
+            with self.lock:
+                values = dict(self.values)
+                histograms = {key: [counts[:], count, total] for key, (counts, count, total) in self.histograms.items()}
+            extra = (('pid', os.getpid()),)
+        lines = []
+        for name, (kind, help_text, buckets) in METRIC_SPECS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if buckets is None:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f'{name}{format_labels(labels + extra)} {value}')
+                continue
+            for (metric, labels), (counts, count, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{format_labels(labels + extra + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_bucket{format_labels(labels + extra + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{format_labels(labels + extra)} {total}')
+                lines.append(f'{name}_count{format_labels(labels + extra)} {count}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+class RequestStats:
+    """单个请求的路由、开始时间与 SQL 统计"""
+    __slots__ = ('route', 'method', 'started', 'statements', 'sql_seconds')
+
+    def __init__(self, route, method):
+        self.route = route
+        self.method = method
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+# 当前请求的统计，Flask 线程与 asgi.py 的协程都通过 contextvar 取得
+REQUEST_STATS = contextvars.ContextVar('request_stats', default=None)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and REQUEST_STATS.get() is not None:
+        context._statement_started = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = REQUEST_STATS.get()
+    started = getattr(context, '_statement_started', None)
+    if stats is not None and started is not None:
+        stats.statements += 1
+        stats.sql_seconds += time.perf_counter() - started
+
+def record_request(stats, status):
+    """请求结束：更新指标，超过查询预算时记录警告"""
+    elapsed = time.perf_counter() - stats.started
+    route = (('route', stats.route),)
+    metrics.inc('http_requests_total', route + (('method', stats.method), ('status', status)))
+    metrics.observe('http_request_duration_seconds', route + (('method', stats.method),), elapsed)
+    metrics.observe('db_statements_per_request', route, stats.statements)
+    metrics.inc('db_statement_seconds_total', route, stats.sql_seconds)
+    fields = {
+        'route': stats.route,
+        'method': stats.method,
+        'status': status,
+        'duration_ms': round(elapsed * 1000, 2),
+        'sql_statements': stats.statements,
+        'sql_ms': round(stats.sql_seconds * 1000, 2)
+    }
+    if stats.statements > app.config['SQL_QUERY_BUDGET']:
+        metrics.inc('db_query_budget_exceeded_total', route)
+        logger.warning('query budget exceeded', extra={'fields': fields})
+    else:
+        logger.debug('request', extra={'fields': fields})
+
+@app.before_request
+def start_request_stats():
+    g.request_stats = RequestStats(request.url_rule.rule if request.url_rule else 'unmatched', request.method)
+    REQUEST_STATS.set(g.request_stats)
+
+@app.after_request
+def capture_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_stats(exc):
+    """在请求上下文出栈时记录，流式响应因此包含输出期间执行的查询"""
+    stats = g.pop('request_stats', None)
+    if stats is not None:
+        REQUEST_STATS.set(None)
+        record_request(stats, g.pop('response_status', 500))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 抓取接口"""
+    return Response(metrics.render(app.config['METRICS_DIR']), mimetype='text/plain; version=0.0.4')
+
+# 准入控制：按预算限制并发，满载时在有界队列中最多等待 ADMISSION_QUEUE_TIMEOUT 秒，队列已满或等待超时立即返回
+# 503 + Retry-After，而不是堆积在 SQLite 锁和写连接池上直到超时。写请求共用 write 预算（写连接池只有一个连接），
+# 批量写入共用 bulk_write 预算，列表、检索与分面等重型只读路由共用 read 预算，导出使用 export_items 预算；
+# 在 ADMISSION_BUDGETS 中以 endpoint 名配置的路由改用自己的预算，其余路由不限制（配置 default 后作为其余路由
+# 各自的预算）。预算按进程计算；gthread 模式下排队的请求同样占用一个线程，因此默认预算按每个 worker 的线程数
+# 生成，并始终留出 ADMISSION_RESERVED_THREADS 比例（至少两个）的线程给不受限的路由；python data.py 启动时
+# 检查全部预算的并发与队列之和小于 --threads，不满足时拒绝启动。
+# ADMISSION_BUDGETS 环境变量形如 'read=2:2,write=1:8'（名称=并发:队列），覆盖对应的默认值。
+DEFAULT_THREADS = 8
+ADMISSION_RESERVED_THREADS = 0.25
+HEAVY_READ_ENDPOINTS = {'get_all_items', 'search_items', 'get_item_facets', 'search_data_items'}
+ADMISSION_EXEMPT = {'metrics_endpoint', 'static_asset', 'static'}
+BULK_WRITE_ENDPOINTS = {'bulk_create_items', 'bulk_delete_items', 'bulk_create_data_items', 'bulk_delete_data_items'}
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# 默认预算的基础名额，多出的线程按此顺序轮流分给 read 与 write 的并发或队列
+ADMISSION_BASE_BUDGETS = ('read', 'write', 'export_items', 'bulk_write')
+ADMISSION_EXTRA_SLOTS = (('read', 0), ('write', 1), ('read', 1))
+
+def reserved_threads(threads):
+    return max(2, int(threads * ADMISSION_RESERVED_THREADS))
+
+def default_admission_budgets(threads):
+    """按每个 worker 的线程数生成默认预算：留出 reserved_threads 个线程后，每个预算先得到一个并发名额，
+    其余名额轮流分配。线程数不足以给每个预算一个名额时由 check_admission_budgets 报告"""
+    budgets = {name: [1, 0] for name in ADMISSION_BASE_BUDGETS}
+    for index in range(threads - reserved_threads(threads) - len(budgets)):
+        name, slot = ADMISSION_EXTRA_SLOTS[index % len(ADMISSION_EXTRA_SLOTS)]
+        budgets[name][slot] += 1
+    return {name: tuple(budget) for name, budget in budgets.items()}
+
+def parse_budgets(value):
+    budgets = {}
+    for part in value.split(','):
+        if part.strip():
+            name, _, spec = part.partition('=')
+            limit, _, queue = spec.partition(':')
+            budgets[name.strip()] = (int(limit), int(queue or 0))
+    return budgets
+
+def admission_budgets(threads):
+    """按线程数生成的默认预算，再以 ADMISSION_BUDGETS 环境变量覆盖"""
+    return {**default_admission_budgets(threads), **parse_budgets(os.environ.get('ADMISSION_BUDGETS', ''))}
+
+app.config['ADMISSION_CONTROL'] = os.environ.get('ADMISSION_CONTROL', '1').lower() in ('1', 'true', 'yes')
+app.config['ADMISSION_BUDGETS'] = admission_budgets(int(os.environ.get('WEB_THREADS', DEFAULT_THREADS)))
+app.config['ADMISSION_QUEUE_TIMEOUT'] = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 1.0))
+app.config['ADMISSION_RETRY_AFTER'] = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+
+def admission_budget_name(endpoint, method):
+    if endpoint in BULK_WRITE_ENDPOINTS:
+        return 'bulk_write'
+    if method not in READ_METHODS:
+        return 'write'
+    if endpoint in HEAVY_READ_ENDPOINTS and endpoint not in app.config['ADMISSION_BUDGETS']:
+        return 'read'
+    return endpoint
+
+def admission_budget(endpoint, method):
+    """返回 (预算名称, 并发上限, 队列长度)，不受准入控制的请求返回 None；asgi.py 按同样的规则选择预算。
+    /events 的连接数上限 EVENTS_MAX_STREAMS 不随 ADMISSION_CONTROL 关闭，超出时同样返回 503"""
+    if endpoint == 'events':
+        return 'events', app.config['EVENTS_MAX_STREAMS'], 0
+    if not app.config['ADMISSION_CONTROL'] or endpoint is None or endpoint in ADMISSION_EXEMPT:
+        return None
+    name = admission_budget_name(endpoint, method)
+    budgets = app.config['ADMISSION_BUDGETS']
+    budget = budgets.get(name, budgets.get('default'))
+    return None if budget is None else (name, *budget)
+
+def check_admission_budgets(threads):
+    """受准入控制的请求（含排队）在一个 worker 中最多占用的线程数必须小于 threads，否则返回错误说明。
+    只统计实际有路由使用的预算，default 按使用它的路由数计算"""
+    held = {}
+    for rule in app.url_map.iter_rules():
+        for method in rule.methods:
+            budget = admission_budget(rule.endpoint, method)
+            if budget is not None:
+                held[budget[0]] = budget[1] + budget[2]
+    total = sum(held.values())
+    if total >= threads:
+        return (f'admission budgets and EVENTS_MAX_STREAMS can hold {total} threads per worker but --threads is '
+                f'{threads}; raise --threads, lower ADMISSION_BUDGETS or EVENTS_MAX_STREAMS, or set ADMISSION_CONTROL=0')
+    return None
+
+class AdmissionLimiter:
+    """并发上限与有界等待队列：有空闲名额且无人排队时直接放行，否则排队等待，先到先得"""
+    def __init__(self, name, limit, queue):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+
+    def acquire(self, timeout):
+        """取得一个名额，成功返回 None，被拒绝时返回原因：queue_full 或 timeout"""
+        labels = (('budget', self.name),)
+        with self.condition:
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                return None
+            if self.waiting >= self.queue:
+                rejected = 'queue_full'
+            else:
+                started = time.monotonic()
+                rejected = self.wait(started + timeout)
+                waited = time.monotonic() - started
+        if rejected == 'queue_full':
+            metrics.inc('admission_rejected_total', labels + (('reason', rejected),))
+            return rejected
+        metrics.inc('admission_queued_total', labels)
+        if rejected is not None:
+            metrics.inc('admission_rejected_total', labels + (('reason', rejected),))
+        else:
+            metrics.observe('admission_wait_seconds', labels, waited)
+        return rejected
+
+    def wait(self, deadline):
+        self.waiting += 1
+        try:
+            while self.active >= self.limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # 超时时可能刚被唤醒，把名额让给下一个排队者
+                    self.condition.notify()
+                    return 'timeout'
+                self.condition.wait(remaining)
+            self.active += 1
+            return None
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+def report_admission(limiters):
+    for limiter in list(limiters):
+        labels = (('budget', limiter.name),)
+        metrics.set('admission_active', labels, limiter.active)
+        metrics.set('admission_queue_depth', labels, limiter.waiting)
+
+def overloaded_body():
+    return {'error': 'server is busy, retry later'}
+
+def overloaded_headers():
+    return {'Retry-After': str(app.config['ADMISSION_RETRY_AFTER'])}
+
+ADMISSION_LIMITERS = {}
+metrics.collectors.append(lambda: report_admission(ADMISSION_LIMITERS.values()))
+
+@app.before_request
+def admit_request():
+    budget = admission_budget(request.endpoint, request.method)
+    if budget is None:
+        return None
+    limiter = ADMISSION_LIMITERS.get(budget[0])
+    if limiter is None:
+        limiter = ADMISSION_LIMITERS.setdefault(budget[0], AdmissionLimiter(*budget))
+    if limiter.acquire(app.config['ADMISSION_QUEUE_TIMEOUT']) is not None:
+        return jsonify(overloaded_body()), 503, overloaded_headers()
+    g.admission = limiter
+    return None
+
+@app.after_request
+def hold_admission_while_streaming(response):
+    """流式响应（导出、?stream=1）在输出结束、WSGI 服务器关闭响应时才释放名额"""
+    if response.is_streamed and 'admission' in g:
+        response.call_on_close(g.pop('admission').release)
+    return response
+
+@app.teardown_request
+def release_admission(exc):
+    limiter = g.pop('admission', None)
+    if limiter is not None:
+        limiter.release()
+
+# 数据模型定义
+class Item(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    data_sources_name = db.Column(db.String(100), nullable=False, index=True)
+    data_sources_code = db.Column(db.String(100), nullable=False, index=True)
+    abstracts = db.Column(db.String(100))
+    data_range = db.Column(db.String(50))
+    frequency_of_updates = db.Column(db.String(50))
+    sources_format = db.Column(db.String(50))
+    field = db.Column(db.String(50))
+    status = db.Column(db.String(10))
+    visible_range = db.Column(db.String(20))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    created_at = db.Column(db.Float, nullable=False, default=time.time, server_default='0')
+    updated_at = db.Column(db.Float, nullable=False, default=time.time, onupdate=time.time, server_default='0')
+    # 子表由数据库 ON DELETE CASCADE 删除，删除主数据项时不加载数据项
+    data_items = db.relationship('DataItem', backref='item', lazy=True, cascade="all, delete-orphan",
+                                 passive_deletes=True)
+
+    __mapper_args__ = {'version_id_col': version}
+
+class DataItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id', ondelete='CASCADE'), nullable=False, index=True)
+    field_label_zh = db.Column(db.String(100))
+    field_label_en = db.Column(db.String(100))
+    field_type = db.Column(db.String(100))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    created_at = db.Column(db.Float, nullable=False, default=time.time, server_default='0')
+    updated_at = db.Column(db.Float, nullable=False, default=time.time, onupdate=time.time, server_default='0')
+
+    __mapper_args__ = {'version_id_col': version}
+
+class TableVersion(db.Model):
+    """表级版本号，由触发器在每次写入时递增，用于条件请求的 ETag"""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.Float, nullable=False, default=0)
+
+class ChangeLog(db.Model):
+    """变更记录：每个写入过的行只保留最新一条（删除的行保留为墓碑），由触发器维护。
+    AUTOINCREMENT 保证 seq 不复用，替换掉最大 seq 的记录后新记录的 seq 仍然更大"""
+    seq = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('table_name', 'row_id'), {'sqlite_autoincrement': True})
+
+class FacetCount(db.Model):
+    """分面计数：按所属主数据项的 status 分组的各字段取值计数，由触发器增量维护。空值记为空字符串"""
+    facet = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(10), primary_key=True)
+    value = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class ImportCheckpoint(db.Model):
+    """批量导入断点，与每批数据在同一事务内提交"""
+    source = db.Column(db.String(500), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+
+# 数据项数量：关联子查询，默认不加载，列表查询直接 select 该属性随主查询一次取出
+Item.data_items_count = column_property(
+    select(func.count(DataItem.id)).where(DataItem.item_id == Item.id).correlate_except(DataItem).scalar_subquery(),
+    deferred=True
+)
+
+# 数据库结构迁移：PRAGMA user_version 记录已应用的版本，启动前按序执行未应用的迁移。
+# 新库同样从第 1 版开始执行，因此每个迁移都必须可重复执行（IF NOT EXISTS 等）。全部迁移按版本号集中在这里，
+# 建表使用固定的 DDL；迁移中用到的索引、触发器与回填 SQL 的构造函数在各自功能的章节中定义。
+MIGRATIONS = []
+
+def migration(version):
+    """注册一个结构迁移，函数接收已开启事务的连接"""
+    def register(fn):
+        MIGRATIONS.append((version, fn))
+        return fn
+    return register
+
+# 各版本新建的表写成固定的 DDL，迁移的结果不随之后模型的变化而改变；之后的列与约束变化由对应版本的迁移完成
+V1_DDL = (
+    'CREATE TABLE IF NOT EXISTS item ('
+    'id INTEGER NOT NULL, '
+    'data_sources_name VARCHAR(100) NOT NULL, '
+    'data_sources_code VARCHAR(100) NOT NULL, '
+    'abstracts VARCHAR(100), '
+    'data_range VARCHAR(50), '
+    'frequency_of_updates VARCHAR(50), '
+    'sources_format VARCHAR(50), '
+    'field VARCHAR(50), '
+    'status VARCHAR(10), '
+    'visible_range VARCHAR(20), '
+    'PRIMARY KEY (id))',
+    'CREATE TABLE IF NOT EXISTS data_item ('
+    'id INTEGER NOT NULL, '
+    'item_id INTEGER NOT NULL, '
+    'field_label_zh VARCHAR(100), '
+    'field_label_en VARCHAR(100), '
+    'field_type VARCHAR(100), '
+    'PRIMARY KEY (id), '
+    'FOREIGN KEY(item_id) REFERENCES item (id))'
+)
+IMPORT_CHECKPOINT_DDL = (
+    'CREATE TABLE IF NOT EXISTS import_checkpoint ('
+    'source VARCHAR(500) NOT NULL, '
+    'position INTEGER NOT NULL, '
+    'imported INTEGER NOT NULL, '
+    'rejected INTEGER NOT NULL, '
+    'PRIMARY KEY (source))'
+)
+TABLE_VERSION_DDL = (
+    'CREATE TABLE IF NOT EXISTS table_version ('
+    'name VARCHAR(50) NOT NULL, '
+    'version INTEGER NOT NULL, '
+    'updated_at FLOAT NOT NULL, '
+    'PRIMARY KEY (name))'
+)
+DATA_ITEM_V7_COLUMNS = 'id, item_id, field_label_zh, field_label_en, field_type, version'
+DATA_ITEM_V7_DDL = (
+    'CREATE TABLE data_item ('
+    'id INTEGER NOT NULL, '
+    'item_id INTEGER NOT NULL, '
+    'field_label_zh VARCHAR(100), '
+    'field_label_en VARCHAR(100), '
+    'field_type VARCHAR(100), '
+    "version INTEGER DEFAULT '1' NOT NULL, "
+    'PRIMARY KEY (id), '
+    'FOREIGN KEY(item_id) REFERENCES item (id) ON DELETE CASCADE)'
+)
+CHANGE_LOG_DDL = (
+    'CREATE TABLE IF NOT EXISTS change_log ('
+    'seq INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, '
+    'table_name VARCHAR(50) NOT NULL, '
+    'row_id INTEGER NOT NULL, '
+    'item_id INTEGER NOT NULL, '
+    'deleted BOOLEAN NOT NULL, '
+    'changed_at FLOAT NOT NULL, '
+    'UNIQUE (table_name, row_id))'
+)
+FACET_COUNT_DDL = (
+    'CREATE TABLE IF NOT EXISTS facet_count ('
+    'facet VARCHAR(50) NOT NULL, '
+    'status VARCHAR(10) NOT NULL, '
+    'value VARCHAR(100) NOT NULL, '
+    'count INTEGER NOT NULL, '
+    'PRIMARY KEY (facet, status, value))'
+)
+
+@migration(1)
+def create_tables(conn):
+    """初始表结构"""
+    for ddl in V1_DDL:
+        conn.exec_driver_sql(ddl)
+
+@migration(2)
+def add_lookup_indexes(conn):
+    """检索字段与 data_item.item_id 索引"""
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_item_data_sources_name ON item (data_sources_name)')
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_item_data_sources_code ON item (data_sources_code)')
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_data_item_item_id ON data_item (item_id)')
+
+@migration(3)
+def create_search_index(conn):
+    """全文检索表，并为已有数据建立索引"""
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS item_fts USING fts5("
+        "name, code, abstracts, labels, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    refresh_search_index(conn, conn.execute(select(Item.id)).scalars())
+
+@migration(4)
+def create_import_checkpoints(conn):
+    """批量导入断点表"""
+    conn.exec_driver_sql(IMPORT_CHECKPOINT_DDL)
+
+@migration(5)
+def create_table_versions(conn):
+    """表版本号及维护触发器"""
+    conn.exec_driver_sql(TABLE_VERSION_DDL)
+    for table in VERSIONED_TABLES:
+        conn.execute(sqlite_insert(TableVersion).values(name=table, version=0, updated_at=time.time())
+                     .on_conflict_do_nothing())
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_version_{operation.lower()} AFTER {operation} ON {table} "
+                f"BEGIN UPDATE table_version SET version = version + 1, "
+                f"updated_at = (julianday('now') - 2440587.5) * 86400.0 WHERE name = '{table}'; END"
+            )
+
+@migration(6)
+def add_row_versions(conn):
+    """乐观锁版本号列"""
+    for table in ('item', 'data_item'):
+        columns = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table})')}
+        if 'version' not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+@migration(7)
+def cascade_data_item_deletes(conn):
+    """data_item.item_id 改为 ON DELETE CASCADE。SQLite 不能修改外键约束，按官方步骤重建表：
+    改名旧表、按第 7 版结构建新表、复制数据（丢弃主数据项已不存在的孤儿行）、删除旧表，再恢复表上的触发器"""
+    if any(row[2] == 'item' and row[6] == 'CASCADE' for row in conn.exec_driver_sql('PRAGMA foreign_key_list(data_item)')):
+        return
+    triggers = conn.exec_driver_sql(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'data_item'"
+    ).all()
+    for name, _ in triggers:
+        conn.exec_driver_sql(f'DROP TRIGGER {name}')
+    conn.exec_driver_sql('DROP INDEX IF EXISTS ix_data_item_item_id')
+    conn.exec_driver_sql('ALTER TABLE data_item RENAME TO data_item_old')
+    conn.exec_driver_sql(DATA_ITEM_V7_DDL)
+    conn.exec_driver_sql('CREATE INDEX ix_data_item_item_id ON data_item (item_id)')
+    conn.exec_driver_sql(
+        f'INSERT INTO data_item ({DATA_ITEM_V7_COLUMNS}) SELECT {DATA_ITEM_V7_COLUMNS} FROM data_item_old '
+        f'WHERE item_id IN (SELECT id FROM item)'
+    )
+    conn.exec_driver_sql('DROP TABLE data_item_old')
+    for _, sql in triggers:
+        conn.exec_driver_sql(sql)
+
+@migration(8)
+def create_change_log(conn):
+    """创建/修改时间列、变更记录表及维护触发器，已有数据全部记入变更记录"""
+    for table in ('item', 'data_item'):
+        columns = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table})')}
+        for column in ('created_at', 'updated_at'):
+            if column not in columns:
+                conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} FLOAT NOT NULL DEFAULT '0'")
+        conn.execute(text(f'UPDATE {table} SET created_at = :now, updated_at = :now WHERE created_at = 0'),
+                     {'now': time.time()})
+    conn.exec_driver_sql(CHANGE_LOG_DDL)
+    for table, owner in (('item', 'id'), ('data_item', 'item_id')):
+        conn.exec_driver_sql(
+            f"INSERT OR IGNORE INTO change_log (table_name, row_id, item_id, deleted, changed_at) "
+            f"SELECT '{table}', id, {owner}, 0, updated_at FROM {table} ORDER BY id"
+        )
+        for operation, ref, deleted in (('INSERT', 'NEW', 0), ('UPDATE', 'NEW', 0), ('DELETE', 'OLD', 1)):
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_changes_{operation.lower()} AFTER {operation} ON {table} "
+                f"BEGIN INSERT OR REPLACE INTO change_log (table_name, row_id, item_id, deleted, changed_at) "
+                f"VALUES ('{table}', {ref}.id, {ref}.{owner}, {deleted}, "
+                f"(julianday('now') - 2440587.5) * 86400.0); END"
+            )
+
+@migration(9)
+def create_facet_counts(conn):
+    """分面计数表及维护触发器，按已有数据重建计数"""
+    conn.exec_driver_sql(FACET_COUNT_DDL)
+    conn.execute(delete(FacetCount))
+    for facet in ITEM_FACETS:
+        conn.exec_driver_sql(
+            f"INSERT INTO facet_count (facet, status, value, count) "
+            f"SELECT '{facet}', COALESCE(status, ''), COALESCE({facet}, ''), count(*) FROM item GROUP BY 2, 3"
+        )
+    conn.exec_driver_sql(
+        f"INSERT INTO facet_count (facet, status, value, count) "
+        f"SELECT '{DATA_ITEM_FACET}', COALESCE(item.status, ''), COALESCE(data_item.field_type, ''), count(*) "
+        f"FROM data_item JOIN item ON item.id = data_item.item_id GROUP BY 2, 3"
+    )
+    columns = ', '.join(ITEM_FACETS)
+    changed = ' OR '.join(f'OLD.{facet} IS NOT NEW.{facet}' for facet in ITEM_FACETS)
+    triggers = {
+        'item_facets_insert': f"AFTER INSERT ON item BEGIN {item_facet_sql('NEW', 1)} END",
+        'item_facets_update': f"AFTER UPDATE OF {columns} ON item WHEN {changed} "
+                              f"BEGIN {item_facet_sql('OLD', -1)} {item_facet_sql('NEW', 1)} END",
+        'item_facets_move': f"AFTER UPDATE OF status ON item WHEN OLD.status IS NOT NEW.status "
+                            f"BEGIN {children_facet_sql('OLD', '-')} {children_facet_sql('NEW', '')} END",
+        'item_facets_delete': f"AFTER DELETE ON item BEGIN {item_facet_sql('OLD', -1)} END",
+        'item_facets_delete_children': f"BEFORE DELETE ON item BEGIN {children_facet_sql('OLD', '-')} END",
+        'data_item_facets_insert': f"AFTER INSERT ON data_item BEGIN {data_item_facet_sql('NEW', 1)} END",
+        'data_item_facets_update': f"AFTER UPDATE OF field_type, item_id ON data_item "
+                                   f"WHEN OLD.field_type IS NOT NEW.field_type OR OLD.item_id IS NOT NEW.item_id "
+                                   f"BEGIN {data_item_facet_sql('OLD', -1)} {data_item_facet_sql('NEW', 1)} END",
+        'data_item_facets_delete': f"AFTER DELETE ON data_item BEGIN {data_item_facet_sql('OLD', -1)} END",
+    }
+    for name, body in triggers.items():
+        conn.exec_driver_sql(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+
+@migration(10)
+def create_data_item_search_index(conn):
+    """数据项三元组全文表、维护触发器，并为已有数据建立索引"""
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS data_item_fts USING fts5("
+        "field_label_zh, field_label_en, field_type, content = 'data_item', content_rowid = 'id', tokenize = 'trigram')"
+    )
+    columns = 'field_label_zh, field_label_en, field_type'
+    new_values = 'NEW.id, NEW.field_label_zh, NEW.field_label_en, NEW.field_type'
+    old_values = "'delete', OLD.id, OLD.field_label_zh, OLD.field_label_en, OLD.field_type"
+    insert_new = f'INSERT INTO data_item_fts (rowid, {columns}) VALUES ({new_values});'
+    delete_old = f'INSERT INTO data_item_fts (data_item_fts, rowid, {columns}) VALUES ({old_values});'
+    triggers = {
+        'data_item_fts_insert': f'AFTER INSERT ON data_item BEGIN {insert_new} END',
+        'data_item_fts_update': f'AFTER UPDATE OF {columns} ON data_item BEGIN {delete_old} {insert_new} END',
+        'data_item_fts_delete': f'AFTER DELETE ON data_item BEGIN {delete_old} END',
+    }
+    for name, body in triggers.items():
+        conn.exec_driver_sql(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+    conn.exec_driver_sql("INSERT INTO data_item_fts (data_item_fts) VALUES ('rebuild')")
+
+def migrate():
+    """将数据库升级到最新版本，返回本次执行的迁移版本号"""
+    applied = []
+    for version, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        with db.engine.begin() as conn:
+            current = conn.exec_driver_sql('PRAGMA user_version').scalar()
+            if version <= current:
+                continue
+            fn(conn)
+            conn.exec_driver_sql(f'PRAGMA user_version = {version}')
+        applied.append(version)
+    return applied
+
+@app.cli.command('migrate')
+def migrate_command():
+    """升级数据库结构"""
+    applied = migrate()
+    click.echo(f"Applied migrations: {applied}" if applied else "Database is up to date")
+
+# 全文检索：item_fts 以 item.id 为 rowid，汇总名称、代码、摘要及其数据项的中英文标签。
+# unicode61 分词器不切分中日韩文字，写入与查询前都把 CJK 字符拆成单字，
+# 查询时多字词按短语匹配，相当于一元切分。
+CJK_CHAR = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])')
+SEARCH_INDEX_CHUNK = 500
+
+def segment_cjk(value):
+    """在每个 CJK 字符两侧插入空格，便于 unicode61 按单字分词"""
+    return CJK_CHAR.sub(r' \1 ', value) if value else ''
+
+def fts_query(value, column=None):
+    """把用户输入转换为 FTS5 查询：空格分隔的词之间为 AND，每个词按短语前缀匹配"""
+    phrases = []
+    for term in value.split():
+        tokens = re.findall(r'\w+', segment_cjk(term))
+        if tokens:
+            phrases.append('"%s"*' % ' '.join(tokens))
+    if not phrases:
+        return None
+    expr = ' AND '.join(phrases)
+    return f'{column} : ({expr})' if column else expr
+
+def search_hits(match):
+    """全文命中的 item_id 与 bm25 相关度（越小越相关），名称与代码权重最高"""
+    return text(
+        'SELECT rowid AS item_id, bm25(item_fts, 10.0, 5.0, 1.0, 2.0) AS rank '
+        'FROM item_fts WHERE item_fts MATCH :match'
+    ).bindparams(match=match).columns(item_id=db.Integer, rank=db.Float).subquery('hits')
+
+def refresh_search_index(conn, item_ids):
+    """按当前数据重建指定主数据项的索引行，已删除的主数据项只删除不重建"""
+    item_ids = sorted(set(item_ids))
+    for start in range(0, len(item_ids), SEARCH_INDEX_CHUNK):
+        chunk = item_ids[start:start + SEARCH_INDEX_CHUNK]
+        labels = {}
+        for item_id, label_zh, label_en in conn.execute(
+                select(DataItem.item_id, DataItem.field_label_zh, DataItem.field_label_en)
+                .where(DataItem.item_id.in_(chunk))):
+            labels.setdefault(item_id, []).extend(label for label in (label_zh, label_en) if label)
+        rows = [{
+            'rowid': item_id,
+            'name': segment_cjk(name),
+            'code': segment_cjk(code),
+            'abstracts': segment_cjk(abstracts),
+            'labels': segment_cjk(' '.join(labels.get(item_id, ())))
+        } for item_id, name, code, abstracts in conn.execute(
+            select(Item.id, Item.data_sources_name, Item.data_sources_code, Item.abstracts)
+            .where(Item.id.in_(chunk)))]
+        conn.execute(text('DELETE FROM item_fts WHERE rowid IN :ids')
+                     .bindparams(db.bindparam('ids', expanding=True)), {'ids': chunk})
+        if rows:
+            conn.execute(text('INSERT INTO item_fts (rowid, name, code, abstracts, labels) '
+                              'VALUES (:rowid, :name, :code, :abstracts, :labels)'), rows)
+
+@event.listens_for(Session, 'after_flush')
+def sync_search_index(session, flush_context):
+    """ORM 写入后在同一事务内同步受影响主数据项的索引行"""
+    item_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Item):
+            item_ids.add(obj.id)
+        elif isinstance(obj, DataItem):
+            history = inspect(obj).attrs.item_id.history
+            item_ids.update(value for value in chain(history.added, history.unchanged, history.deleted) if value)
+    if item_ids:
+        refresh_search_index(session.connection(), item_ids)
+
+# 条件请求：ETag 由相关表的版本号组成，版本号由触发器维护，
+# 因此 ORM、批量插入、导入命令以及级联删除都会使其失效
+VERSIONED_TABLES = ('item', 'data_item')
+
+def conditional(*tables):
+    """条件 GET：按 tables 的版本号生成强 ETag 和 Last-Modified，If-None-Match 命中时不执行视图直接返回 304"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = g.get('snapshot')
+            if cache is not None:
+                rows = cache.table_versions(tables)
+            else:
+                rows = db.session.execute(
+                    select(TableVersion.name, TableVersion.version, TableVersion.updated_at)
+                    .where(TableVersion.name.in_(tables))
+                ).all()
+            versions = {name: version for name, version, _ in rows}
+            etag = '.'.join(str(versions.get(table, 0)) for table in tables)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = datetime.fromtimestamp(max((row[2] for row in rows), default=0), timezone.utc)
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+def snapshot_read(view):
+    """可由内存快照应答的只读路由：请求开始时判断一次快照是否可用并记入 g.snapshot，
+    conditional 的 ETag 与响应内容因此来自同一数据源。须放在 conditional 之前"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.snapshot = snapshot if snapshot.fresh() else None
+        if app.config['CATALOG_SNAPSHOT']:
+            metrics.inc('catalog_snapshot_reads_total',
+                        (('route', request.url_rule.rule), ('snapshot', 'fresh' if g.snapshot else 'stale')))
+        return view(*args, **kwargs)
+    return wrapper
+
+# 页面静态资源，由 /assets/ 以带内容摘要的文件名提供
+INDEX_CSS = """
+body { font-family: Arial; max-width: 1200px; margin: 0 auto; padding: 20px; }
+input, button { padding: 8px; margin: 5px 0; }
+.input-container { display: flex; flex-wrap: wrap; gap: 10px; margin-bottom: 20px; }
+#viewport { height: 600px; overflow-y: auto; margin-top: 20px; border: 1px solid #ddd; }
+table { width: 100%; border-collapse: collapse; table-layout: fixed; }
+th, td { border: 1px solid #ddd; padding: 8px; text-align: left; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+th { background-color: #f2f2f2; position: sticky; top: 0; }
+th:first-child { width: 60px; }
+th:last-child { width: 170px; }
+tr.spacer td { padding: 0; border: none; }
+button { cursor: pointer; background-color: #007bff; color: white; border: none; padding: 5px 10px; border-radius: 3px; }
+button:hover { background-color: #0056b3; }
+.action-buttons { display: flex; gap: 5px; }
+.edit-form { display: none; margin-top: 10px; padding: 10px; background: #f5f5f5; border-radius: 5px; }
+"""
+
+INDEX_JS = """
+// 列表按页从服务端获取，只渲染可视区域内的行（上下各多渲染 OVERSCAN 行），
+// 滚动接近已加载数据的末尾时自动获取下一页；增删改后只更新对应的行
+const FIELDS = ['data_sources_name', 'data_sources_code', 'abstracts', 'data_range',
+                'frequency_of_updates', 'sources_format', 'status', 'field', 'visible_range'];
+const OVERSCAN = 10;
+
+let rows = [];              // 已加载的主数据项，顺序与服务端一致
+let nextCursor = null;
+let lastQuery = '';
+let loading = null;         // 进行中的分页请求
+let generation = 0;         // 重新加载后丢弃旧请求的结果
+let rowHeight = 41;
+let rowHeightMeasured = false;
+let renderScheduled = false;
+const rowCache = new Map(); // id -> 已创建的 <tr>
+let editPanel = null;       // 编辑表单在第一次编辑时创建，所有行共用
+let currentEditId = null;
+
+function textCell(text) {
+    const td = document.createElement('td');
+    td.textContent = text;
+    td.title = text;
+    return td;
+}
+
+function actionButton(label, handler) {
+    const button = document.createElement('button');
+    button.textContent = label;
+    button.onclick = handler;
+    return button;
+}
+
+// 创建一行，序号列在每次渲染时更新
+function rowElement(item, index) {
+    let row = rowCache.get(item.id);
+    if (!row) {
+        row = document.createElement('tr');
+        row.appendChild(textCell(''));
+        FIELDS.forEach(name => row.appendChild(textCell(item[name] || '--')));
+        const actions = document.createElement('td');
+        actions.className = 'action-buttons';
+        actions.append(
+            actionButton('查看', () => viewItem(item.id)),
+            actionButton('编辑', () => editItem(item.id)),
+            actionButton('删除', () => deleteItem(item.id))
+        );
+        row.appendChild(actions);
+        rowCache.set(item.id, row);
+    }
+    row.firstChild.textContent = index + 1;
+    return row;
+}
+
+function spacer(height) {
+    const row = document.createElement('tr');
+    row.className = 'spacer';
+    const td = document.createElement('td');
+    td.colSpan = 11;
+    td.style.height = height + 'px';
+    row.appendChild(td);
+    return row;
+}
+
+function scheduleRender() {
+    if (!renderScheduled) {
+        renderScheduled = true;
+        requestAnimationFrame(render);
+    }
+}
+
+// 渲染可视区域内的行，其余行用上下两个占位行撑开滚动高度
+function render() {
+    renderScheduled = false;
+    const viewport = document.getElementById('viewport');
+    const visible = Math.ceil(viewport.clientHeight / rowHeight);
+    const start = Math.max(0, Math.floor(viewport.scrollTop / rowHeight) - OVERSCAN);
+    const end = Math.min(rows.length, start + visible + OVERSCAN * 2);
+    const fragment = document.createDocumentFragment();
+    fragment.appendChild(spacer(start * rowHeight));
+    for (let i = start; i < end; i++) {
+        fragment.appendChild(rowElement(rows[i], i));
+    }
+    fragment.appendChild(spacer((rows.length - end) * rowHeight));
+    document.getElementById('rows').replaceChildren(fragment);
+
+    if (!rowHeightMeasured && end > start) {
+        rowHeightMeasured = true;
+        rowHeight = rowCache.get(rows[start].id).getBoundingClientRect().height || rowHeight;
+        scheduleRender();
+    }
+    document.getElementById('summary').textContent =
+        `已加载 ${rows.length} 条` + (nextCursor ? '，滚动到底部加载更多' : '');
+    if (nextCursor && end + OVERSCAN >= rows.length) {
+        loadMore();
+    }
+}
+
+// 获取一页数据，reset 时替换当前列表
+function fetchPage(url, reset) {
+    if (reset) {
+        generation += 1;
+    }
+    const current = generation;
+    const request = fetch(url)
+        .then(response => response.json())
+        .then(data => {
+            if (current !== generation) return;
+            if (reset) {
+                rows = [];
+                rowCache.clear();
+                hideEditForm();
+                document.getElementById('viewport').scrollTop = 0;
+            }
+            rows.push(...data.items);
+            nextCursor = data.next;
+        })
+        .finally(() => {
+            if (loading === request) loading = null;
+            if (current === generation) scheduleRender();
+        });
+    loading = request;
+    return request;
+}
+
+// 加载页面时获取第一页数据
+function loadItems() {
+    lastQuery = '';
+    fetchPage('/items', true)
+        .catch(error => console.error('加载数据失败:', error));
+}
+
+// 加载下一页
+function loadMore() {
+    if (!nextCursor || loading) return;
+    const params = new URLSearchParams(lastQuery);
+    // 含全文条件时按相关度排序，游标是 offset
+    const ranked = params.has('q') || params.has('abstracts');
+    params.set(ranked ? 'offset' : 'after_id', nextCursor);
+    const path = lastQuery ? '/items/search' : '/items';
+    fetchPage(`${path}?${params.toString()}`, false)
+        .catch(error => console.error('加载数据失败:', error));
+}
+
+// 重新加载当前列表（普通列表或检索结果）
+function reloadList() {
+    fetchPage(lastQuery ? `/items/search?${lastQuery}` : '/items', true)
+        .catch(error => console.error('加载数据失败:', error));
+}
+
+// 订阅服务端推送（服务端设置了 EVENTS_URL 时）：其他用户对主数据项的增删改直接更新对应的行，错过推送时重新加载列表
+function subscribeChanges() {
+    const url = document.body.dataset.eventsUrl;
+    if (!url || !window.EventSource) return;
+    const source = new EventSource(url);
+    source.addEventListener('change', event => {
+        const change = JSON.parse(event.data);
+        if (change.type === 'item') {
+            patchRow(change.id, change.op === 'delete' ? null : change.data);
+        }
+    });
+    source.addEventListener('reset', reloadList);
+}
+
+// 获取单个主数据项（不含数据项），已删除时返回 null
+function fetchItem(id) {
+    return fetch(`/items/${id}?include=`).then(response => response.ok ? response.json() : null);
+}
+
+// 更新单行：item 为 null 表示删除；新建的主数据项 id 最大，只在列表已全部加载且不是检索结果时追加到末尾
+function patchRow(id, item) {
+    const index = rows.findIndex(row => row.id === id);
+    rowCache.delete(id);
+    if (item === null) {
+        if (index >= 0) rows.splice(index, 1);
+        if (currentEditId === id) hideEditForm();
+    } else if (index >= 0) {
+        rows[index] = item;
+    } else if (!nextCursor && !lastQuery) {
+        rows.push(item);
+    }
+    scheduleRender();
+}
+
+// 保存数据
+function saveItem() {
+    const data = {
+        data_sources_name: document.getElementById('data_sources_name').value,
+        data_sources_code: document.getElementById('data_sources_code').value,
+        abstracts: document.getElementById('abstracts').value,
+        data_range: document.getElementById('data_range').value,
+        frequency_of_updates: document.getElementById('frequency_of_updates').value,
+        sources_format: document.getElementById('sources_format').value,
+        status: document.getElementById('status').value,
+        field: document.getElementById('field').value,
+        visible_range: document.getElementById('visible_range').value
+    };
+
+    fetch('/items', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(data)
+    })
+    .then(response => {
+        if (!response.ok) {
+            return response.json().then(err => { throw new Error(err.error || '保存失败'); });
+        }
+        return response.json();
+    })
+    .then(data => {
+        alert('保存成功');
+        document.querySelectorAll('.input-container input').forEach(input => input.value = '');
+        return fetchItem(data.id).then(item => patchRow(data.id, item));
+    })
+    .catch(error => {
+        console.error('保存错误:', error);
+        alert('保存失败: ' + error.message);
+    });
+}
+
+// 搜索数据
+function searchItem() {
+    const params = new URLSearchParams();
+    const fields = ['data_sources_name', 'data_sources_code', 'abstracts', 'data_range', 
+                  'frequency_of_updates', 'sources_format', 'status', 'field', 'visible_range', 'q'];
+
+    fields.forEach(field => {
+        const value = document.getElementById(field).value;
+        if (value) params.append(field, value);
+    });
+
+    lastQuery = params.toString();
+    fetchPage(`/items/search?${lastQuery}`, true)
+        .catch(error => console.error('搜索失败:', error));
+}
+
+// 查看详情
+function viewItem(id) {
+    window.location.href = `/items/view/${id}`;
+}
+
+// 编辑表单：第一次编辑时创建
+function createEditPanel() {
+    const panel = document.createElement('div');
+    panel.className = 'edit-form';
+    const title = document.createElement('div');
+    title.className = 'edit-title';
+    panel.appendChild(title);
+    FIELDS.forEach(name => {
+        const source = document.getElementById(name);
+        const input = document.createElement('input');
+        input.name = name;
+        input.placeholder = source.placeholder;
+        input.maxLength = source.maxLength;
+        panel.appendChild(input);
+    });
+    panel.append(
+        actionButton('保存', () => updateItem(currentEditId)),
+        actionButton('取消', () => hideEditForm())
+    );
+    document.getElementById('viewport').before(panel);
+    return panel;
+}
+
+// 编辑数据
+function editItem(id) {
+    const item = rows.find(row => row.id === id);
+    if (!item) return;
+    if (!editPanel) editPanel = createEditPanel();
+    editPanel.querySelector('.edit-title').textContent = `编辑：${item.data_sources_name}`;
+    FIELDS.forEach(name => { editPanel.querySelector(`input[name="${name}"]`).value = item[name] || ''; });
+    editPanel.style.display = 'block';
+    currentEditId = id;
+}
+
+// 隐藏编辑表单
+function hideEditForm() {
+    if (editPanel) editPanel.style.display = 'none';
+    currentEditId = null;
+}
+
+// 更新数据
+function updateItem(id) {
+    const data = {};
+    FIELDS.forEach(name => { data[name] = editPanel.querySelector(`input[name="${name}"]`).value; });
+
+    fetch(`/items/${id}`, {
+        method: 'PUT',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(data)
+    })
+    .then(response => {
+        if (!response.ok) {
+            return response.json().then(err => { throw new Error(err.error || '更新失败'); });
+        }
+        return response.json();
+    })
+    .then(data => {
+        alert('更新成功');
+        hideEditForm();
+        return fetchItem(id).then(item => patchRow(id, item));
+    })
+    .catch(error => {
+        console.error('更新错误:', error);
+        alert('更新失败: ' + error.message);
+    });
+}
+
+// 删除数据
+function deleteItem(id) {
+    if (confirm('确定删除此项吗？')) {
+        fetch(`/items/${id}`, {
+            method: 'DELETE'
+        })
+        .then(response => {
+            if (!response.ok) {
+                return response.json().then(err => { throw new Error(err.error || '删除失败'); });
+            }
+            return response.json();
+        })
+        .then(data => {
+            alert('删除成功');
+            patchRow(id, null);
+        })
+        .catch(error => {
+            console.error('删除错误:', error);
+            alert('删除失败: ' + error.message);
+        });
+    }
+}
+
+// 页面加载时调用
+window.onload = () => {
+    document.getElementById('viewport').addEventListener('scroll', scheduleRender, {passive: true});
+    window.addEventListener('resize', scheduleRender);
+    loadItems();
+    subscribeChanges();
+};
+"""
+
+VIEW_CSS = """
+body { font-family: Arial; max-width: 1200px; margin: 0 auto; padding: 20px; }
+h2 { margin-bottom: 20px; }
+.section { margin-bottom: 30px; }
+.section-title { font-weight: bold; margin-bottom: 10px; }
+.info-grid { display: grid; grid-template-columns: 1fr 1fr; gap: 10px; }
+.info-item { display: flex; align-items: center; }
+.info-item label { width: 120px; font-weight: bold; }
+.info-item span { flex: 1; }
+table { width: 100%; border-collapse: collapse; margin-top: 10px; }
+th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+th { background-color: #f2f2f2; }
+button { padding: 8px 16px; background-color: #007bff; color: white; border: none; border-radius: 3px; cursor: pointer; }
+button:hover { background-color: #0056b3; }
+.data-item-form { display:none; margin:10px 0; background:#f5f5f5; padding:15px; border-radius:5px; }
+.form-grid { display:grid; grid-template-columns:1fr 1fr; gap:10px; margin-bottom:10px; }
+.form-actions { text-align:right; margin-top:10px; }
+"""
+
+VIEW_JS = """
+let currentEditId = null;
+
+function showDataItemForm() {
+    currentEditId = null;
+    document.getElementById('di_label_zh').value = '';
+    document.getElementById('di_label_en').value = '';
+    document.getElementById('di_type').value = 'text';
+    document.getElementById('dataItemForm').style.display = 'block';
+}
+
+function hideDataItemForm() {
+    document.getElementById('dataItemForm').style.display = 'none';
+}
+
+function saveDataItem() {
+    const itemId = document.body.dataset.itemId;
+    const url = currentEditId 
+        ? `/data-items/${currentEditId}` 
+        : `/items/${itemId}/data-items`;
+
+    const method = currentEditId ? 'PUT' : 'POST';
+
+    fetch(url, {
+        method: method,
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+            field_label_zh: document.getElementById('di_label_zh').value,
+            field_label_en: document.getElementById('di_label_en').value,
+            field_type: document.getElementById('di_type').value
+        })
+    }).then(response => {
+        if(response.ok) {
+            location.reload();
+        } else {
+            alert('操作失败');
+        }
+    }).catch(error => {
+        console.error('Error:', error);
+        alert('操作失败');
+    });
+}
+
+function editDataItem(id) {
+    fetch(`/data-items/${id}`)
+        .then(r => r.json())
+        .then(data => {
+            currentEditId = id;
+            document.getElementById('di_label_zh').value = data.field_label_zh || '';
+            document.getElementById('di_label_en').value = data.field_label_en || '';
+            document.getElementById('di_type').value = data.field_type || 'text';
+            document.getElementById('dataItemForm').style.display = 'block';
+        });
+}
+
+function deleteDataItem(id) {
+    if(confirm('确定删除此数据项？')) {
+        fetch(`/data-items/${id}`, {method: 'DELETE'})
+            .then(() => location.reload())
+            .catch(error => {
+                console.error('Error:', error);
+                alert('删除失败');
+            });
+    }
+}
+"""
+
+# 主页面HTML模板
+INDEX_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>数据管理</title>
+    <link rel="stylesheet" href="{{ asset_url('index.css') }}">
+</head>
+<body{% if events_url %} data-events-url="{{ events_url }}"{% endif %}>
+    <h2>数据管理</h2>
+    <div class="input-container">
+        <input id="data_sources_name" placeholder="数据资源名称" maxlength="100">
+        <input id="data_sources_code" placeholder="数据资源代码" maxlength="100">
+        <input id="abstracts" placeholder="摘要信息" maxlength="100">
+        <input id="data_range" placeholder="数据范围" maxlength="50">
+        <input id="frequency_of_updates" placeholder="更新频率" maxlength="50">
+        <input id="sources_format" placeholder="资源格式" maxlength="50">
+        <input id="status" placeholder="状态" maxlength="10">
+        <input id="field" placeholder="所属领域" maxlength="50">
+        <input id="visible_range" placeholder="可见状态" maxlength="20">
+        <input id="q" placeholder="关键词（名称/代码/摘要/字段）">
+        <button onclick="saveItem()">保存</button>
+        <button onclick="searchItem()">搜索</button>
+    </div>
+    <div id="summary"></div>
+    <div id="viewport">
+        <table id="items">
+            <thead>
+                <tr>
+                    <th>序号</th>
+                    <th>数据资源名称</th>
+                    <th>数据资源代码</th>
+                    <th>摘要信息</th>
+                    <th>数据范围</th>
+                    <th>更新频率</th>
+                    <th>资源格式</th>
+                    <th>状态</th>
+                    <th>所属领域</th>
+                    <th>可见范围</th>
+                    <th>操作</th>
+                </tr>
+            </thead>
+            <tbody id="rows"></tbody>
+        </table>
+    </div>
+    <script src="{{ asset_url('index.js') }}"></script>
+</body>
+</html>
+"""
+
+VIEW_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>数据详情</title>
+    <link rel="stylesheet" href="{{ asset_url('view.css') }}">
+</head>
+<body data-item-id="{{ item.id }}">
+    <h2>数据详情</h2>
+
+    <div class="section">
+        <div class="section-title">数据资源信息</div>
+        <div class="info-grid">
+            <div class="info-item">
+                <label>数据资源名称:</label>
+                <span>{{ item.data_sources_name }}</span>
+            </div>
+            <div class="info-item">
+                <label>数据资源代码:</label>
+                <span>{{ item.data_sources_code }}</span>
+            </div>
+            <div class="info-item">
+                <label>摘要信息:</label>
+                <span>{{ item.abstracts or '--' }}</span>
+            </div>
+            <div class="info-item">
+                <label>数据范围:</label>
+                <span>{{ item.data_range or '--' }}</span>
+            </div>
+            <div class="info-item">
+                <label>更新频率:</label>
+                <span>{{ item.frequency_of_updates or '--' }}</span>
+            </div>
+            <div class="info-item">
+                <label>资源格式:</label>
+                <span>{{ item.sources_format or '--' }}</span>
+            </div>
+            <div class="info-item">
+                <label>所属领域:</label>
+                <span>{{ item.field or '--' }}</span>
+            </div>
+            <div class="info-item">
+                <label>状态:</label>
+                <span>{{ item.status or '--' }}</span>
+            </div>
+            <div class="info-item">
+                <label>可见范围:</label>
+                <span>{{ item.visible_range or '--' }}</span>
+            </div>
+        </div>
+    </div>
+
+    <div class="section">
+        <div class="section-title">数据项管理
+            <button onclick="showDataItemForm()">添加数据项</button>
+        </div>
+
+        <div id="dataItemForm" class="data-item-form">
+            <div class="form-grid">
+                <div>
+                    <label>字段中文名:</label>
+                    <input id="di_label_zh" style="width:100%">
+                </div>
+                <div>
+                    <label>字段英文名:</label>
+                    <input id="di_label_en" style="width:100%">
+                </div>
+                <div>
+                    <label>字段类型:</label>
+                    <select id="di_type" style="width:100%">
+                        <option value="text">文本</option>
+                        <option value="number">数字</option>
+                        <option value="date">日期</option>
+                        <option value="boolean">布尔值</option>
+                    </select>
+                </div>
+            </div>
+            <div class="form-actions">
+                <button onclick="saveDataItem()">保存</button>
+                <button onclick="hideDataItemForm()">取消</button>
+            </div>
+        </div>
+
+        <table>
+            <tr>
+                <th>序号</th>
+                <th>字段中文名</th>
+                <th>字段英文名</th>
+                <th>类型</th>
+                <th>操作</th>
+            </tr>
+            {% for di in item.data_items %}
+            <tr>
+                <td>{{ loop.index }}</td>
+                <td>{{ di.field_label_zh or '--' }}</td>
+                <td>{{ di.field_label_en or '--' }}</td>
+                <td>{{ di.field_type or '--' }}</td>
+                <td>
+                    <button onclick="editDataItem({{ di.id }})">编辑</button>
+                    <button onclick="deleteDataItem({{ di.id }})">删除</button>
+                </td>
+            </tr>
+            {% else %}
+            <tr><td colspan="5" style="text-align:center;">暂无数据项</td></tr>
+            {% endfor %}
+        </table>
+    </div>
+
+    <button onclick="window.location.href='/'">返回</button>
+
+    <script src="{{ asset_url('view.js') }}"></script>
+</body>
+</html>
+"""
+
+# 序列化：只读接口直接查询列元组并按字段名组装 dict，不构造 ORM 对象；
+# 语句在模块加载时构造好，请求中只绑定参数，编译结果由 SQLAlchemy 的语句缓存复用
+ITEM_FIELDS = ('id', 'data_sources_name', 'data_sources_code', 'abstracts', 'data_range',
+               'frequency_of_updates', 'sources_format', 'status', 'field', 'visible_range')
+DATA_ITEM_FIELDS = ('id', 'field_label_zh', 'field_label_en', 'field_type')
+ITEM_COLUMNS = tuple(getattr(Item, name) for name in ITEM_FIELDS)
+DATA_ITEM_COLUMNS = tuple(getattr(DataItem, name) for name in DATA_ITEM_FIELDS)
+
+LIST_ITEMS_STMT = select(*ITEM_COLUMNS, Item.data_items_count)
+ITEMS_STMT = select(*ITEM_COLUMNS)
+# 单条记录的详情额外返回乐观锁版本号，供 PATCH 使用
+ITEM_DETAIL_FIELDS = ITEM_FIELDS + ('version',)
+ITEM_DETAIL_STMT = select(*ITEM_COLUMNS, Item.version)
+ITEM_EXISTS_STMT = select(Item.id).where(Item.id == bindparam('item_id'))
+ITEM_DATA_ITEMS_STMT = (select(*DATA_ITEM_COLUMNS)
+                        .where(DataItem.item_id == bindparam('item_id')).order_by(DataItem.id))
+GET_DATA_ITEM_KEYS = ('id', 'item_id') + DATA_ITEM_FIELDS[1:] + ('version',)
+GET_DATA_ITEM_STMT = (select(DataItem.id, DataItem.item_id, *DATA_ITEM_COLUMNS[1:], DataItem.version)
+                      .where(DataItem.id == bindparam('data_item_id')))
+
+class OrjsonProvider(DefaultJSONProvider):
+    """用 orjson 编码请求与响应中的 JSON，orjson 不支持的类型交给 Flask 默认的 default 处理"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS), mimetype=self.mimetype)
+
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+def rows_to_dicts(keys, rows):
+    return [dict(zip(keys, row)) for row in rows]
+
+def data_items_in_stmt(item_ids):
+    """多个主数据项的数据项，第一列为 item_id"""
+    return (select(DataItem.item_id, *DATA_ITEM_COLUMNS)
+            .where(DataItem.item_id.in_(item_ids))
+            .order_by(DataItem.item_id, DataItem.id))
+
+def group_data_items(rows):
+    """把 data_items_in_stmt 的结果按 item_id 分组为 {item_id: [数据项行, ...]}"""
+    children = {}
+    for row in rows:
+        children.setdefault(row[0], []).append(row[1:])
+    return children
+
+def data_items_by_item(item_ids):
+    """用一条 IN 查询取出多个主数据项的数据项"""
+    return group_data_items(db.session.execute(data_items_in_stmt(item_ids))) if item_ids else {}
+
+def merge_data_items(items, children):
+    for item in items:
+        item['data_items'] = rows_to_dicts(DATA_ITEM_FIELDS, children.get(item['id'], ()))
+    return items
+
+def attach_data_items(items):
+    """为一页主数据项 dict 附加 data_items"""
+    return merge_data_items(items, data_items_by_item([item['id'] for item in items]))
+
+# 稀疏字段与关联加载：?fields= 只查询所需的列（总是包含 id），?include=data_items 为整页主数据项
+# 额外执行一条 IN 查询取出数据项
+ITEM_SELECTABLE = {**dict(zip(ITEM_FIELDS, ITEM_COLUMNS)), 'version': Item.version, 'created_at': Item.created_at,
+                   'updated_at': Item.updated_at, 'data_items_count': Item.data_items_count}
+ITEM_INCLUDES = ('data_items',)
+Projection = namedtuple('Projection', 'stmt keys with_data_items')
+
+def parse_projection(default_stmt, default_keys, default_include=(), args=None):
+    """解析 fields / include 参数，返回 (Projection, 错误信息)；未指定 fields 时沿用预先构造的默认语句"""
+    args = request.args if args is None else args
+    fields = args.get('fields', '').strip()
+    if fields:
+        names = ['id'] + [name for name in dict.fromkeys(part.strip() for part in fields.split(','))
+                          if name and name != 'id']
+        unknown = [name for name in names if name not in ITEM_SELECTABLE]
+        if unknown:
+            return None, f"unknown fields: {', '.join(unknown)}"
+        stmt, keys = select(*(ITEM_SELECTABLE[name] for name in names)), tuple(names)
+    else:
+        stmt, keys = default_stmt, default_keys
+    include = args.get('include')
+    includes = set(default_include) if include is None else {part.strip() for part in include.split(',') if part.strip()}
+    unknown = sorted(includes.difference(ITEM_INCLUDES))
+    if unknown:
+        return None, f"unknown include: {', '.join(unknown)}"
+    return Projection(stmt, keys, 'data_items' in includes), None
+
+# 分页参数
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+# 检索支持的等值过滤字段
+ITEM_FILTER_FIELDS = [
+    'data_sources_name',
+    'data_sources_code',
+    'status',
+]
+
+def item_filters(args):
+    """根据查询参数构造 Item 过滤条件，空值参数忽略"""
+    return [getattr(Item, name) == args[name] for name in ITEM_FILTER_FIELDS if args.get(name)]
+
+def search_criteria(args):
+    """检索条件：返回 (过滤条件列表, 全文命中子查询或 None)。
+    q 检索全部索引列，abstracts 只检索摘要；全文输入只含标点等无法检索的字符时不返回任何结果"""
+    filters = item_filters(args)
+    match = []
+    for name, column in (('q', None), ('abstracts', 'abstracts')):
+        value = args.get(name, '').strip()
+        if value:
+            expr = fts_query(value, column)
+            if expr is None:
+                return filters + [false()], None
+            match.append(expr)
+    return filters, search_hits(' AND '.join(match)) if match else None
+
+# 以下参数解析函数接收任意 Mapping 形式的查询参数（默认当前 Flask 请求），异步服务 asgi.py 也复用它们
+def int_arg(args, name, default=None):
+    try:
+        return int(args[name])
+    except (KeyError, TypeError, ValueError):
+        return default
+
+def page_args(args=None):
+    """解析 after_id / limit / offset 分页参数"""
+    args = request.args if args is None else args
+    limit = int_arg(args, 'limit', DEFAULT_PAGE_SIZE)
+    return int_arg(args, 'after_id'), max(1, min(limit, MAX_PAGE_SIZE))
+
+def offset_arg(args=None):
+    return max(0, int_arg(request.args if args is None else args, 'offset', 0))
+
+def wants_stream(args=None):
+    return (request.args if args is None else args).get('stream', '').lower() in ('1', 'true', 'yes')
+
+def serialize_rows(projection, rows):
+    items = rows_to_dicts(projection.keys, rows)
+    return attach_data_items(items) if projection.with_data_items else items
+
+def paginate(projection):
+    """按 id 做键集分页，返回 {'items': [...], 'next': 游标}；语句的第一列须为 Item.id"""
+    after_id, limit = page_args()
+    stmt = projection.stmt if after_id is None else projection.stmt.where(Item.id > after_id)
+    rows = db.session.execute(stmt.order_by(Item.id).limit(limit + 1)).all()
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return jsonify({'items': serialize_rows(projection, rows[:limit]), 'next': next_cursor})
+
+def paginate_ranked(projection):
+    """相关度排序的结果无法按 id 键集翻页，改用 offset，next 为下一页的 offset"""
+    _, limit = page_args()
+    offset = offset_arg()
+    rows = db.session.execute(projection.stmt.offset(offset).limit(limit + 1)).all()
+    next_offset = offset + limit if len(rows) > limit else None
+    return jsonify({'items': serialize_rows(projection, rows[:limit]), 'next': next_offset})
+
+def stream_ndjson(projection):
+    """按批次拉取并逐行输出 NDJSON；语句的第一列须为 Item.id"""
+    after_id, _ = page_args()
+
+    def generate():
+        last_id = after_id
+        while True:
+            stmt = projection.stmt if last_id is None else projection.stmt.where(Item.id > last_id)
+            rows = db.session.execute(stmt.order_by(Item.id).limit(STREAM_BATCH_SIZE)).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            yield ''.join(app.json.dumps(item) + '\n' for item in serialize_rows(projection, rows))
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def list_items(projection):
+    if wants_stream():
+        return stream_ndjson(projection)
+    return paginate(projection)
+
+def snapshot_page(cache, projection, filters):
+    """与 paginate 相同的键集分页，由内存快照应答；filters 为 {字段: 值} 等值条件"""
+    after_id, limit = page_args()
+    items = cache.page(after_id, limit, projection.keys, projection.with_data_items, filters)
+    return jsonify({'items': items[:limit], 'next': items[limit - 1]['id'] if len(items) > limit else None})
+
+# 写入校验与批量插入
+MAX_BULK_ROWS = 10000
+
+def validate_item(data):
+    """校验主数据项（含嵌套的 data_items），返回错误信息，通过时返回 None"""
+    if not isinstance(data, dict):
+        return 'item must be a JSON object'
+    if not data.get('data_sources_name'):
+        return 'data_sources_name is required'
+    if not data.get('data_sources_code'):
+        return 'data_sources_code is required'
+    children = data.get('data_items') or []
+    if not isinstance(children, list):
+        return 'data_items must be a list'
+    for index, child in enumerate(children):
+        error = validate_data_item(child)
+        if error:
+            return f'data_items[{index}]: {error}'
+    return None
+
+def validate_data_item(data):
+    """校验数据项，返回错误信息，通过时返回 None"""
+    if not isinstance(data, dict):
+        return 'data item must be a JSON object'
+    if not data.get('field_label_zh'):
+        return 'field_label_zh is required'
+    return None
+
+def item_values(data):
+    """主数据项的列值，缺省值与 create_item 一致"""
+    return {
+        'data_sources_name': data['data_sources_name'],
+        'data_sources_code': data['data_sources_code'],
+        'abstracts': data.get('abstracts'),
+        'data_range': data.get('data_range'),
+        'frequency_of_updates': data.get('frequency_of_updates'),
+        'sources_format': data.get('sources_format'),
+        'status': data.get('status', 'active'),
+        'field': data.get('field'),
+        'visible_range': data.get('visible_range', 'public')
+    }
+
+def data_item_values(data, item_id):
+    """数据项的列值，缺省值与 create_data_item 一致"""
+    return {
+        'item_id': item_id,
+        'field_label_zh': data['field_label_zh'],
+        'field_label_en': data.get('field_label_en'),
+        'field_type': data.get('field_type', 'text')
+    }
+
+def apply_item_changes(item, data):
+    """PUT 语义：只更新请求中出现的字段"""
+    for name in ITEM_FIELDS[1:]:
+        if name in data:
+            setattr(item, name, data[name])
+
+def apply_data_item_changes(data_item, data):
+    for name in DATA_ITEM_FIELDS[1:]:
+        if name in data:
+            setattr(data_item, name, data[name])
+
+# PATCH：单条 UPDATE ... WHERE id = ? AND version = ?，只写入请求中的列并递增版本号，不加锁；
+# 没有更新任何行时再查一次当前版本，记录不存在返回 404，版本不一致返回 409。
+# ORM 写入（PUT、DELETE）通过 version_id_col 同样检查并递增版本号。
+PATCH_RULES = {
+    # 模型: (可修改字段, 不可为空的字段, 影响全文索引的字段, 所属主数据项 id 列)
+    Item: (ITEM_FIELDS[1:], ('data_sources_name', 'data_sources_code'),
+           {'data_sources_name', 'data_sources_code', 'abstracts'}, Item.id),
+    DataItem: (DATA_ITEM_FIELDS[1:], ('field_label_zh',), {'field_label_zh', 'field_label_en'}, DataItem.item_id)
+}
+
+def patch_changes(model, data):
+    """解析 PATCH 请求体，返回 (变更 dict, 版本号, 错误信息)"""
+    fields, required, _, _ = PATCH_RULES[model]
+    if not isinstance(data, dict):
+        return None, None, 'request body must be a JSON object'
+    version = data.get('version')
+    if not isinstance(version, int) or isinstance(version, bool):
+        return None, None, 'version is required'
+    changes = {name: value for name, value in data.items() if name != 'version'}
+    unknown = sorted(set(changes) - set(fields))
+    if unknown:
+        return None, None, f'unknown fields: {", ".join(unknown)}'
+    if not changes:
+        return None, None, 'no fields to update'
+    for name in required:
+        if name in changes and not changes[name]:
+            return None, None, f'{name} is required'
+    return changes, version, None
+
+def versioned_update_stmt(model, row_id, version, changes):
+    """版本号匹配时更新并返回 (新版本号, 所属主数据项 id)"""
+    owner = PATCH_RULES[model][3]
+    return (update(model).where(model.id == row_id, model.version == version)
+            .values(**changes, version=model.version + 1)
+            .returning(model.version, owner)
+            .execution_options(synchronize_session=False))
+
+def patch_row(model, row_id):
+    """在当前会话中执行 PATCH 并提交，返回 (新版本号, None) 或 (None, 错误响应)"""
+    changes, version, error = patch_changes(model, request.get_json(silent=True))
+    if error:
+        return None, (jsonify({'error': error}), 400)
+    row = db.session.execute(versioned_update_stmt(model, row_id, version, changes)).first()
+    if row is None:
+        current = db.session.execute(select(model.version).where(model.id == row_id)).scalar()
+        db.session.rollback()
+        if current is None:
+            return None, (jsonify({'error': f'{model.__table__.name} not found'}), 404)
+        return None, (jsonify({'error': 'version conflict', 'version': current}), 409)
+    if PATCH_RULES[model][2] & changes.keys():
+        refresh_search_index(db.session.connection(), [row[1]])
+    db.session.commit()
+    return row[0], None
+
+def insert_data_items(conn, item_id_records):
+    """批量插入数据项，参数为 (item_id, 数据项 dict) 列表，按参数顺序返回新 id"""
+    if not item_id_records:
+        return []
+    return conn.execute(
+        insert(DataItem).returning(DataItem.id, sort_by_parameter_order=True),
+        [data_item_values(record, item_id) for item_id, record in item_id_records]
+    ).scalars().all()
+
+def insert_items(conn, records):
+    """在当前事务内批量插入已校验的主数据项及嵌套数据项，返回 [(item_id, [data_item_id, ...]), ...]"""
+    if not records:
+        return []
+    item_ids = conn.execute(
+        insert(Item).returning(Item.id, sort_by_parameter_order=True),
+        [item_values(record) for record in records]
+    ).scalars().all()
+    children = [(item_id, child) for item_id, record in zip(item_ids, records)
+                for child in record.get('data_items') or []]
+    child_ids = iter(insert_data_items(conn, children))
+    refresh_search_index(conn, item_ids)
+    return [(item_id, [next(child_ids) for _ in record.get('data_items') or []])
+            for item_id, record in zip(item_ids, records)]
+
+def read_bulk_rows():
+    """读取批量请求体：JSON 数组，或 Content-Type 为 application/x-ndjson 时每行一个对象。
+    返回 (行列表, 错误信息)，NDJSON 中无法解析的行以 ValueError 占位，由调用方记为该行错误"""
+    if request.mimetype == 'application/x-ndjson':
+        rows = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(app.json.loads(line))
+            except ValueError as e:
+                rows.append(ValueError(f'invalid JSON: {e}'))
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return None, 'request body must be a JSON array or NDJSON'
+    if len(rows) > MAX_BULK_ROWS:
+        return None, f'at most {MAX_BULK_ROWS} rows per request'
+    return rows, None
+
+def bulk_response(results):
+    """批量写入的汇总结果，全部失败时返回 400"""
+    created = sum(1 for result in results if 'id' in result)
+    body = {'created': created, 'failed': len(results) - created, 'results': results}
+    return jsonify(body), 201 if created or not results else 400
+
+# 静态资源：文件名带内容摘要（/assets/index.3f2a9c1e0b7d.js），内容变化即换 URL，因此可以让浏览器长期缓存；
+# 压缩结果在启动时生成一次。HTML、JSON 等动态响应超过 COMPRESS_MIN_SIZE 字节时按 Accept-Encoding 压缩。
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+ASSET_MAX_AGE = 365 * 24 * 3600
+COMPRESSIBLE_MIMETYPES = {'text/html', 'text/css', 'text/plain', 'application/javascript', 'application/json'}
+CONTENT_ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+Asset = namedtuple('Asset', ['mimetype', 'fingerprint', 'bodies'])
+ASSETS = {}
+ASSET_URLS = {}
+
+def compress(body, encoding, static=False):
+    """gzip 或 brotli 压缩；静态资源只压缩一次，使用最高压缩级别"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=11 if static else 4)
+    return gzip.compress(body, compresslevel=9 if static else 6, mtime=0)
+
+def accepted_encoding():
+    """客户端可接受的压缩格式，优先 brotli（需安装 brotli 包）"""
+    for encoding in CONTENT_ENCODINGS:
+        if request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+def register_asset(name, content, mimetype):
+    body = content.encode('utf-8')
+    fingerprint = hashlib.sha256(body).hexdigest()[:12]
+    stem, ext = os.path.splitext(name)
+    bodies = {None: body}
+    bodies.update((encoding, compress(body, encoding, static=True)) for encoding in CONTENT_ENCODINGS)
+    ASSETS[f'{stem}.{fingerprint}{ext}'] = Asset(mimetype, fingerprint, bodies)
+    ASSET_URLS[name] = f'/assets/{stem}.{fingerprint}{ext}'
+
+register_asset('index.css', INDEX_CSS, 'text/css')
+register_asset('index.js', INDEX_JS, 'application/javascript')
+register_asset('view.css', VIEW_CSS, 'text/css')
+register_asset('view.js', VIEW_JS, 'application/javascript')
+
+@app.template_global()
+def asset_url(name):
+    return request.script_root + ASSET_URLS[name]
+
+@app.route('/assets/<name>')
+def static_asset(name):
+    """带摘要的静态资源，可长期缓存"""
+    asset = ASSETS.get(name)
+    if asset is None:
+        abort(404)
+    encoding = accepted_encoding()
+    response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(asset.fingerprint + (f'-{encoding}' if encoding else ''))
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+@app.after_request
+def compress_response(response):
+    """压缩较大的非流式响应；强 ETag 改为弱 ETag，conditional 以弱比较匹配 If-None-Match"""
+    if (response.is_streamed or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or (response.content_length or 0) < app.config['COMPRESS_MIN_SIZE']):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+# 模板在导入时编译一次（多进程部署时在 master 中预加载，fork 后各 worker 共享）
+INDEX_TEMPLATE = app.jinja_env.from_string(INDEX_HTML)
+VIEW_TEMPLATE = app.jinja_env.from_string(VIEW_HTML)
+
+def render_compiled(template, **context):
+    """渲染预编译模板，与 render_template_string 一样注入模板上下文处理器的变量"""
+    app.update_template_context(context)
+    return template.render(context)
+
+# 主数据(Item)路由
+@app.route('/items', methods=['GET'])
+@read_only
+@snapshot_read
+@conditional('item', 'data_item')
+def get_all_items():
+    """分页获取主数据项（?after_id=&limit=，?stream=1 时以 NDJSON 流式输出，?fields= / ?include=data_items）"""
+    try:
+        projection, error = parse_projection(LIST_ITEMS_STMT, ITEM_FIELDS + ('data_items_count',))
+        if error:
+            return jsonify({'error': error}), 400
+        if g.snapshot is not None and not wants_stream():
+            return snapshot_page(g.snapshot, projection, {})
+        return list_items(projection)
+    except Exception as e:
+        logger.exception('get_all_items failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/items/search', methods=['GET'])
+@read_only
+@snapshot_read
+@conditional('item', 'data_item')
+def search_items():
+    """检索主数据项：字段等值过滤，q 为名称/代码/摘要/数据项标签的全文检索，abstracts 仅检索摘要。
+    含全文条件时按相关度排序并以 offset 翻页，否则与 /items 相同按 after_id 翻页"""
+    try:
+        filters, hits = search_criteria(request.args)
+        projection, error = parse_projection(ITEMS_STMT, ITEM_FIELDS)
+        if error:
+            return jsonify({'error': error}), 400
+        equality = {name: request.args[name] for name in ITEM_FILTER_FIELDS if request.args.get(name)}
+        # 快照只应答纯等值过滤；全文输入无法检索时 search_criteria 会追加 false()，条件数因此不相等
+        if g.snapshot is not None and hits is None and len(filters) == len(equality) and not wants_stream():
+            return snapshot_page(g.snapshot, projection, equality)
+        projection = projection._replace(stmt=projection.stmt.where(*filters))
+        if hits is not None:
+            projection = projection._replace(stmt=projection.stmt.join(hits, Item.id == hits.c.item_id))
+            if not wants_stream():
+                return paginate_ranked(projection._replace(stmt=projection.stmt.order_by(hits.c.rank, Item.id)))
+        return list_items(projection)
+    except Exception as e:
+        logger.exception('search_items failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/items/<int:item_id>', methods=['GET'])
+@read_only
+@snapshot_read
+@conditional('item', 'data_item')
+def get_item(item_id):
+    """获取单个主数据项详情，默认包含 data_items（?include= 置空可省略），支持 ?fields="""
+    try:
+        projection, error = parse_projection(ITEM_DETAIL_STMT, ITEM_DETAIL_FIELDS, default_include=ITEM_INCLUDES)
+        if error:
+            return jsonify({'error': error}), 400
+        if g.snapshot is not None:
+            item = g.snapshot.item(item_id, projection.keys, projection.with_data_items)
+            if item is None:
+                abort(404)
+            return jsonify(item)
+        row = db.session.execute(projection.stmt.where(Item.id == bindparam('item_id')), {'item_id': item_id}).first()
+        if row is None:
+            abort(404)
+        item = dict(zip(projection.keys, row))
+        if projection.with_data_items:
+            item['data_items'] = rows_to_dicts(DATA_ITEM_FIELDS, db.session.execute(ITEM_DATA_ITEMS_STMT, {'item_id': item_id}))
+        return jsonify(item)
+    except HTTPException as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        logger.exception('get_item failed')
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/items', methods=['POST'])
+def create_item():
+    """创建主数据项，可在 data_items 中同时提交其数据项"""
+    try:
+        data = request.json
+        error = validate_item(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        [(item_id, data_item_ids)] = insert_items(db.session.connection(), [data])
+        db.session.commit()
+        logger.info('item created', extra={'fields': {'item_id': item_id}})
+
+        return jsonify({
+            'id': item_id,
+            'status': 'created',
+            'data_items_count': len(data_item_ids)
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('create_item failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/items/<int:item_id>', methods=['PUT'])
+def update_item(item_id):
+    """更新主数据项"""
+    try:
+        item = Item.query.get_or_404(item_id)
+        data = request.json
+
+        apply_item_changes(item, data)
+        db.session.commit()
+        logger.info('item updated', extra={'fields': {'item_id': item_id}})
+        return jsonify({'status': 'updated', 'item_id': item_id})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('update_item failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/items/<int:item_id>', methods=['PATCH'])
+def patch_item(item_id):
+    """部分更新主数据项：请求体为要修改的字段及读取时的 version，版本已变化时返回 409"""
+    try:
+        version, error = patch_row(Item, item_id)
+        if error:
+            return error
+        return jsonify({'status': 'updated', 'item_id': item_id, 'version': version})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('patch_item failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/items/<int:item_id>', methods=['DELETE'])
+def delete_item(item_id):
+    """删除主数据项"""
+    try:
+        item = Item.query.get_or_404(item_id)
+        db.session.delete(item)
+        db.session.commit()
+        logger.info('item deleted', extra={'fields': {'item_id': item_id}})
+        return jsonify({'status': 'deleted', 'item_id': item_id})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('delete_item failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/items', methods=['DELETE'])
+def bulk_delete_items():
+    """按条件批量删除主数据项（条件同 /items/search，至少一个），数据项由数据库级联删除，返回删除数量"""
+    try:
+        filters, hits = search_criteria(request.args)
+        if hits is not None:
+            filters.append(Item.id.in_(select(hits.c.item_id)))
+        if not filters:
+            return jsonify({'error': 'at least one filter is required'}), 400
+        conn = db.session.connection()
+        item_ids = conn.execute(delete(Item).where(*filters).returning(Item.id)).scalars().all()
+        refresh_search_index(conn, item_ids)
+        db.session.commit()
+        logger.info('items deleted', extra={'fields': {'count': len(item_ids)}})
+        return jsonify({'status': 'deleted', 'deleted': len(item_ids)})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('bulk_delete_items failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/items/bulk', methods=['POST'])
+def bulk_create_items():
+    """批量创建主数据项（可嵌套 data_items），单个事务内批量插入，逐行返回 id 或错误"""
+    try:
+        rows, error = read_bulk_rows()
+        if error:
+            return jsonify({'error': error}), 400
+        results, valid = [], []
+        for index, row in enumerate(rows):
+            error = str(row) if isinstance(row, ValueError) else validate_item(row)
+            results.append({'index': index, 'error': error} if error else None)
+            if not error:
+                valid.append((index, row))
+        inserted = insert_items(db.session.connection(), [row for _, row in valid])
+        db.session.commit()
+        for (index, _), (item_id, data_item_ids) in zip(valid, inserted):
+            results[index] = {'index': index, 'id': item_id, 'data_item_ids': data_item_ids}
+        return bulk_response(results)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('bulk_create_items failed')
+        return jsonify({'error': str(e)}), 500
+
+# 分面统计：facet_count 按 (分面, 主数据项 status, 取值) 保存计数，由触发器在每次写入时增减，
+# 不带条件或只按 status 过滤时直接汇总该表，开销与数据量无关；其他检索条件无法由汇总表回答，
+# 改为对命中的主数据项分组计数。数据项的 field_type 计数归入其主数据项的 status：
+# 主数据项修改 status 时整体迁移其数据项的计数，删除前先扣除（级联删除数据项时主数据项已不存在，
+# 数据项的删除触发器查不到 status 因而不会重复扣减）。
+ITEM_FACETS = ('status', 'field', 'sources_format', 'frequency_of_updates', 'visible_range')
+DATA_ITEM_FACET = 'field_type'
+FACET_UPSERT = 'ON CONFLICT DO UPDATE SET count = count + excluded.count'
+
+def item_facet_sql(ref, delta):
+    """主数据项各分面按 ref（NEW/OLD）的取值增减 delta 的语句"""
+    return ' '.join(
+        f"INSERT INTO facet_count (facet, status, value, count) "
+        f"VALUES ('{facet}', COALESCE({ref}.status, ''), COALESCE({ref}.{facet}, ''), {delta}) {FACET_UPSERT};"
+        for facet in ITEM_FACETS
+    )
+
+def data_item_facet_sql(ref, delta):
+    """数据项 field_type 计数增减 delta 的语句，主数据项不存在时不做任何事"""
+    return (f"INSERT INTO facet_count (facet, status, value, count) "
+            f"SELECT '{DATA_ITEM_FACET}', COALESCE(status, ''), COALESCE({ref}.field_type, ''), {delta} "
+            f"FROM item WHERE id = {ref}.item_id {FACET_UPSERT};")
+
+def children_facet_sql(ref, sign):
+    """主数据项 ref 下全部数据项的 field_type 计数按 ref.status 整体增减"""
+    return (f"INSERT INTO facet_count (facet, status, value, count) "
+            f"SELECT '{DATA_ITEM_FACET}', COALESCE({ref}.status, ''), COALESCE(field_type, ''), {sign}count(*) "
+            f"FROM data_item WHERE item_id = {ref}.id GROUP BY 3 {FACET_UPSERT};")
+
+def facet_stmt(args):
+    """返回 (分面, 取值, 计数) 的查询语句，检索条件与 /items/search 相同"""
+    filters, hits = search_criteria(args)
+    # 汇总表只能回答至多一个 status 条件；其他等值条件、全文检索以及无法检索的输入（search_criteria
+    # 以 false() 表示）都走按命中范围计数的查询，结果与 /items/search 一致
+    if hits is None and len(filters) == (1 if args.get('status') else 0):
+        stmt = select(FacetCount.facet, FacetCount.value, func.sum(FacetCount.count)).where(FacetCount.count > 0)
+        if args.get('status'):
+            stmt = stmt.where(FacetCount.status == args['status'])
+        return stmt.group_by(FacetCount.facet, FacetCount.value)
+    scope = select(Item.id).where(*filters)
+    if hits is not None:
+        scope = scope.join(hits, Item.id == hits.c.item_id)
+    scope = scope.cte('scope')
+    in_scope = select(scope.c.id)
+    columns = [(facet, getattr(Item, facet), Item.id) for facet in ITEM_FACETS]
+    columns.append((DATA_ITEM_FACET, DataItem.field_type, DataItem.item_id))
+    parts = []
+    for facet, column, owner in columns:
+        value = func.coalesce(column, '')
+        parts.append(select(literal(facet), value, func.count()).where(owner.in_(in_scope)).group_by(value))
+    return union_all(*parts)
+
+def facet_summary(rows):
+    """{'items': 主数据项数, 'data_items': 数据项数, 'facets': {分面: {取值: 计数}}}"""
+    facets = {facet: {} for facet in ITEM_FACETS + (DATA_ITEM_FACET,)}
+    for facet, value, count in rows:
+        facets[facet][value] = count
+    return {
+        'items': sum(facets['status'].values()),
+        'data_items': sum(facets[DATA_ITEM_FACET].values()),
+        'facets': facets
+    }
+
+@app.route('/items/facets', methods=['GET'])
+@read_only
+@conditional('item', 'data_item')
+def get_item_facets():
+    """按 status / field / sources_format / frequency_of_updates / visible_range 统计主数据项数量，
+    按 field_type 统计数据项数量；可带 /items/search 的检索条件，未填写的值计入空字符串"""
+    try:
+        return jsonify(facet_summary(db.session.execute(facet_stmt(request.args)).all()))
+    except Exception as e:
+        logger.exception('get_item_facets failed')
+        return jsonify({'error': str(e)}), 500
+
+# 全量导出
+EXPORT_BATCH_SIZE = 1000
+CSV_DATA_ITEM_COLUMNS = ('data_item_id', 'field_label_zh', 'field_label_en', 'field_type')
+
+def export_batches(conditions):
+    """按 id 键集分批读取主数据项，每批再用一条 IN 查询取出全部数据项，产出 (主数据行, {item_id: [数据项行]})"""
+    last_id = 0
+    while True:
+        items = db.session.execute(
+            select(*ITEM_COLUMNS).where(*conditions, Item.id > last_id).order_by(Item.id).limit(EXPORT_BATCH_SIZE)
+        ).all()
+        if not items:
+            return
+        last_id = items[-1].id
+        yield items, data_items_by_item([item.id for item in items])
+
+def export_ndjson(batches):
+    """每行一个主数据项，数据项嵌套在 data_items 中"""
+    for items, children in batches:
+        yield ''.join(app.json.dumps({
+            **dict(zip(ITEM_FIELDS, item)),
+            'data_items': rows_to_dicts(DATA_ITEM_FIELDS, children.get(item.id, ()))
+        }) + '\n' for item in items)
+
+def export_csv(batches):
+    """每个数据项一行并重复其主数据列，没有数据项的主数据项输出一行空数据项列"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ITEM_FIELDS + CSV_DATA_ITEM_COLUMNS)
+    for items, children in batches:
+        for item in items:
+            for child in children.get(item.id) or [(None,) * len(CSV_DATA_ITEM_COLUMNS)]:
+                writer.writerow(tuple(item) + tuple(child))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+@app.route('/items/export', methods=['GET'])
+@read_only
+def export_items():
+    """流式导出主数据项及其数据项（?format=ndjson|csv），过滤参数与 /items/search 相同"""
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({'error': 'format must be ndjson or csv'}), 400
+        filters, hits = search_criteria(request.args)
+        if hits is not None:
+            filters.append(Item.id.in_(select(hits.c.item_id)))
+        batches = export_batches(filters)
+        if export_format == 'csv':
+            body, mimetype = export_csv(batches), 'text/csv'
+        else:
+            body, mimetype = export_ndjson(batches), 'application/x-ndjson'
+        return Response(stream_with_context(body), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename=items.{export_format}'
+        })
+    except Exception as e:
+        logger.exception('export_items failed')
+        return jsonify({'error': str(e)}), 500
+
+# 数据项(DataItem)路由
+@app.route('/items/<int:item_id>/data-items', methods=['GET'])
+@read_only
+@snapshot_read
+@conditional('item', 'data_item')
+def get_all_data_items(item_id):
+    """获取某个主数据项的所有数据项"""
+    try:
+        if g.snapshot is not None:
+            data_items = g.snapshot.data_items_of(item_id)
+            if data_items is None:
+                abort(404)
+            return jsonify(data_items)
+        if db.session.execute(ITEM_EXISTS_STMT, {'item_id': item_id}).first() is None:
+            abort(404)
+        return jsonify(rows_to_dicts(DATA_ITEM_FIELDS, db.session.execute(ITEM_DATA_ITEMS_STMT, {'item_id': item_id})))
+    except HTTPException as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        logger.exception('get_all_data_items failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/items/<int:item_id>/data-items', methods=['POST'])
+def create_data_item(item_id):
+    """为某个主数据项创建数据项"""
+    try:
+        item = Item.query.get_or_404(item_id)
+        data = request.json
+        error = validate_data_item(data)
+        if error:
+            return jsonify({'error': error}), 400
+        data_item = DataItem(**data_item_values(data, item_id), item=item)
+        db.session.add(data_item)
+        db.session.commit()
+        return jsonify({
+            'id': data_item.id,
+            'item_id': item_id,
+            'status': 'created'
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('create_data_item failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/items/<int:item_id>/data-items/bulk', methods=['POST'])
+def bulk_create_data_items(item_id):
+    """为某个主数据项批量创建数据项，逐行返回 id 或错误"""
+    try:
+        Item.query.get_or_404(item_id)
+        rows, error = read_bulk_rows()
+        if error:
+            return jsonify({'error': error}), 400
+        results, valid = [], []
+        for index, row in enumerate(rows):
+            error = str(row) if isinstance(row, ValueError) else validate_data_item(row)
+            results.append({'index': index, 'error': error} if error else None)
+            if not error:
+                valid.append((index, row))
+        conn = db.session.connection()
+        ids = insert_data_items(conn, [(item_id, row) for _, row in valid])
+        if ids:
+            refresh_search_index(conn, [item_id])
+        db.session.commit()
+        for (index, _), data_item_id in zip(valid, ids):
+            results[index] = {'index': index, 'id': data_item_id}
+        return bulk_response(results)
+    except HTTPException as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('bulk_create_data_items failed')
+        return jsonify({'error': str(e)}), 500
+
+# 批量删除数据项支持的等值过滤字段
+DATA_ITEM_FILTER_FIELDS = [
+    'field_label_zh',
+    'field_label_en',
+    'field_type',
+]
+
+@app.route('/data-items', methods=['DELETE'])
+def bulk_delete_data_items():
+    """按条件批量删除数据项（item_id 与字段等值过滤，至少一个），返回删除数量"""
+    try:
+        filters = [getattr(DataItem, name) == request.args[name]
+                   for name in DATA_ITEM_FILTER_FIELDS if request.args.get(name)]
+        if 'item_id' in request.args:
+            item_id = int_arg(request.args, 'item_id')
+            if item_id is None:
+                return jsonify({'error': 'item_id must be an integer'}), 400
+            filters.append(DataItem.item_id == item_id)
+        if not filters:
+            return jsonify({'error': 'at least one filter is required'}), 400
+        conn = db.session.connection()
+        item_ids = conn.execute(delete(DataItem).where(*filters).returning(DataItem.item_id)).scalars().all()
+        refresh_search_index(conn, item_ids)
+        db.session.commit()
+        return jsonify({'status': 'deleted', 'deleted': len(item_ids)})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('bulk_delete_data_items failed')
+        return jsonify({'error': str(e)}), 500
+
+# 数据项检索：data_item_fts 为 data_item 的外部内容全文表，trigram 分词器把标签与类型切成三字符片段，
+# 子串匹配即短语匹配，无需前缀通配也不依赖分词，中英文一致。由触发器随 data_item 同步（含批量写入、
+# 导入与级联删除）。检索词不足三个字符时无法使用三元组索引，改为 LIKE 扫描
+TRIGRAM_LENGTH = 3
+DATA_ITEM_HIT_FIELDS = ('id', 'item_id') + DATA_ITEM_FIELDS[1:]
+DATA_ITEM_HIT_ITEM_FIELDS = ('id', 'data_sources_name', 'data_sources_code', 'status')
+DATA_ITEM_HITS_STMT = (select(DataItem.id, DataItem.item_id, *DATA_ITEM_COLUMNS[1:],
+                              Item.data_sources_name, Item.data_sources_code, Item.status)
+                       .join(Item, DataItem.item_id == Item.id))
+
+def trigram_query(value, fuzzy=False):
+    """data_item_fts 的 MATCH 表达式：默认整个检索词作为短语，即子串匹配；fuzzy 时为各三字符片段的 OR，
+    共有片段越多相关度越高，可容忍错字与词序差异"""
+    if fuzzy:
+        grams = dict.fromkeys(value[i:i + TRIGRAM_LENGTH] for i in range(len(value) - TRIGRAM_LENGTH + 1))
+        return ' OR '.join('"%s"' % gram.replace('"', '""') for gram in grams)
+    return '"%s"' % value.replace('"', '""')
+
+def data_item_search_stmt(args):
+    """返回 (按相关度排序的检索语句, 错误信息)，参数为 q 与 fuzzy"""
+    value = args.get('q', '').strip()
+    if not value:
+        return None, 'q is required'
+    if len(value) < TRIGRAM_LENGTH:
+        columns = (DataItem.field_label_zh, DataItem.field_label_en, DataItem.field_type)
+        matches = or_(*(column.contains(value, autoescape=True) for column in columns))
+        return DATA_ITEM_HITS_STMT.where(matches).order_by(DataItem.id), None
+    fuzzy = args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+    hits = text(
+        'SELECT rowid AS data_item_id, bm25(data_item_fts, 2.0, 2.0, 1.0) AS rank '
+        'FROM data_item_fts WHERE data_item_fts MATCH :match'
+    ).bindparams(match=trigram_query(value, fuzzy)).columns(data_item_id=db.Integer, rank=db.Float).subquery('hits')
+    return DATA_ITEM_HITS_STMT.join(hits, DataItem.id == hits.c.data_item_id).order_by(hits.c.rank, DataItem.id), None
+
+def data_item_hits(rows):
+    """检索结果行转为数据项 dict，item 为所属主数据项摘要"""
+    hits = []
+    for row in rows:
+        width = len(DATA_ITEM_HIT_FIELDS)
+        hit = dict(zip(DATA_ITEM_HIT_FIELDS, row[:width]))
+        hit['item'] = dict(zip(DATA_ITEM_HIT_ITEM_FIELDS, (hit['item_id'],) + tuple(row[width:])))
+        hits.append(hit)
+    return hits
+
+@app.route('/data-items/search', methods=['GET'])
+@read_only
+@conditional('item', 'data_item')
+def search_data_items():
+    """全目录检索数据项：q 在中英文标签与字段类型中做子串匹配，fuzzy=1 时按三字符片段近似匹配。
+    按相关度排序并以 offset 翻页，每个结果附带所属主数据项的 id、名称、代码与状态"""
+    try:
+        stmt, error = data_item_search_stmt(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        _, limit = page_args()
+        offset = offset_arg()
+        rows = db.session.execute(stmt.offset(offset).limit(limit + 1)).all()
+        next_offset = offset + limit if len(rows) > limit else None
+        return jsonify({'data_items': data_item_hits(rows[:limit]), 'next': next_offset})
+    except Exception as e:
+        logger.exception('search_data_items failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/data-items/<int:data_item_id>', methods=['GET'])
+@read_only
+@snapshot_read
+@conditional('data_item')
+def get_data_item(data_item_id):
+    """获取单个数据项详情"""
+    try:
+        if g.snapshot is not None:
+            data_item = g.snapshot.data_item(data_item_id)
+            if data_item is None:
+                abort(404)
+            return jsonify(data_item)
+        row = db.session.execute(GET_DATA_ITEM_STMT, {'data_item_id': data_item_id}).first()
+        if row is None:
+            abort(404)
+        return jsonify(dict(zip(GET_DATA_ITEM_KEYS, row)))
+    except HTTPException as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        logger.exception('get_data_item failed')
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/data-items/<int:data_item_id>', methods=['PUT'])
+def update_data_item(data_item_id):
+    """更新数据项"""
+    try:
+        data_item = DataItem.query.get_or_404(data_item_id)
+        data = request.json
+        apply_data_item_changes(data_item, data)
+        db.session.commit()
+        return jsonify({'status': 'updated', 'data_item_id': data_item_id})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('update_data_item failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/data-items/<int:data_item_id>', methods=['PATCH'])
+def patch_data_item(data_item_id):
+    """部分更新数据项，规则同 PATCH /items/<id>"""
+    try:
+        version, error = patch_row(DataItem, data_item_id)
+        if error:
+            return error
+        return jsonify({'status': 'updated', 'data_item_id': data_item_id, 'version': version})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('patch_data_item failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/data-items/<int:data_item_id>', methods=['DELETE'])
+def delete_data_item(data_item_id):
+    """删除数据项"""
+    try:
+        data_item = DataItem.query.get_or_404(data_item_id)
+        db.session.delete(data_item)
+        db.session.commit()
+        return jsonify({'status': 'deleted', 'data_item_id': data_item_id})
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('delete_data_item failed')
+        return jsonify({'error': str(e)}), 500
+
+# 增量同步：change_log 记录每个主数据项/数据项最近一次变化的 seq，客户端保存上次返回的 next，
+# 下次以 since 传入，只取之后变化的行。since=0 返回全部数据，相当于首次全量同步
+CHANGE_ITEM_FIELDS = ITEM_DETAIL_FIELDS + ('created_at', 'updated_at')
+CHANGE_DATA_ITEM_FIELDS = GET_DATA_ITEM_KEYS + ('created_at', 'updated_at')
+ITEM_ROW_STMT = select(*ITEM_COLUMNS, Item.version, Item.created_at, Item.updated_at)
+DATA_ITEM_ROW_STMT = select(DataItem.id, DataItem.item_id, *DATA_ITEM_COLUMNS[1:], DataItem.version,
+                            DataItem.created_at, DataItem.updated_at)
+CHANGE_ROW_STMTS = {
+    'item': (ITEM_ROW_STMT.where(Item.id.in_(bindparam('ids', expanding=True))), CHANGE_ITEM_FIELDS),
+    'data_item': (DATA_ITEM_ROW_STMT.where(DataItem.id.in_(bindparam('ids', expanding=True))), CHANGE_DATA_ITEM_FIELDS)
+}
+CHANGES_STMT = (select(ChangeLog.seq, ChangeLog.table_name, ChangeLog.row_id, ChangeLog.item_id, ChangeLog.deleted)
+                .where(ChangeLog.seq > bindparam('since')).order_by(ChangeLog.seq).limit(bindparam('limit')))
+
+def read_changes(execute, since, limit):
+    """读取 since 之后的最多 limit 条变更及对应行的当前值，execute 为会话或连接的 execute。
+    返回 (变更列表, 是否还有更多)"""
+    entries = execute(CHANGES_STMT, {'since': since, 'limit': limit + 1}).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    rows = {}
+    for table, (stmt, keys) in CHANGE_ROW_STMTS.items():
+        ids = [row_id for _, name, row_id, _, deleted in entries if name == table and not deleted]
+        rows[table] = {row[0]: dict(zip(keys, row)) for row in execute(stmt, {'ids': ids})} if ids else {}
+    changes = []
+    for seq, table, row_id, item_id, deleted in entries:
+        change = {'seq': seq, 'type': table, 'id': row_id, 'item_id': item_id, 'deleted': deleted}
+        if not deleted:
+            change['data'] = rows[table].get(row_id)
+        changes.append(change)
+    return changes, has_more
+
+@app.route('/changes', methods=['GET'])
+@read_only
+@conditional('item', 'data_item')
+def get_changes():
+    """返回游标 since 之后变化的行，按 seq 排序，每行只出现一次：现存的行附带当前值，已删除的行 deleted 为 true。
+    ?limit= 控制每页条数；next 为下次请求使用的游标，has_more 表示是否还有未取完的变更"""
+    try:
+        since = int_arg(request.args, 'since', 0)
+        _, limit = page_args()
+        changes, has_more = read_changes(db.session.execute, since, limit)
+        return jsonify({'changes': changes, 'next': changes[-1]['seq'] if changes else since, 'has_more': has_more})
+    except Exception as e:
+        logger.exception('get_changes failed')
+        return jsonify({'error': str(e)}), 500
+
+# 实时推送：每个进程一个后台线程轮询 change_log（多个 worker 进程共享的 SQLite 文件充当消息代理），
+# 新变更放入环形缓冲区并唤醒本进程的所有订阅者；本进程提交写事务后立即唤醒轮询线程，其他进程的写入
+# 最迟在 EVENTS_POLL_INTERVAL 秒后推送。订阅者只记录自己的游标，空闲连接不占用轮询开销。
+# gthread 模式下每个订阅连接在断开前一直占用一个线程，因此 Flask 的 /events 每个 worker 最多同时保持
+# EVENTS_MAX_STREAMS 个连接（默认 0，即不提供，返回 503），该数量计入启动时对 --threads 的检查。
+# 推送由 asgi.py 的 /events 提供（每个连接一个协程）：反向代理把 /events 转发给 uvicorn 运行的 asgi:app，
+# 其余路径转发给 gunicorn，并设置 EVENTS_URL=/events，页面只在设置了 EVENTS_URL 时订阅。nginx 示例：
+#     location /events { proxy_pass http://127.0.0.1:8001; proxy_buffering off; proxy_read_timeout 1h; }
+#     location /       { proxy_pass http://127.0.0.1:5000; }
+app.config['EVENTS_POLL_INTERVAL'] = float(os.environ.get('EVENTS_POLL_INTERVAL', 1.0))
+app.config['EVENTS_BUFFER_SIZE'] = int(os.environ.get('EVENTS_BUFFER_SIZE', 1000))
+app.config['EVENTS_MAX_STREAMS'] = int(os.environ.get('EVENTS_MAX_STREAMS', 0))
+app.config['EVENTS_URL'] = os.environ.get('EVENTS_URL', '')
+EVENTS_KEEPALIVE = 15
+EVENTS_BATCH_SIZE = 500
+
+class ChangeBroker:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.wakeup = threading.Event()
+        self.events = deque()   # (seq, SSE 消息)
+        self.head = 0           # 已读取的最大 seq
+        self.floor = 0          # 已移出缓冲区的最大 seq，游标早于它的订阅者需要重新加载
+        self.listeners = set()  # 异步订阅者的唤醒回调
+        self.consumers = []     # 每次轮询时在同一读事务内调用的 (连接, 变更, 是否还有更多, 提交代数)
+        self.commits = 0        # 本进程已提交的写事务数（提交代数）
+        self.thread = None
+        self.engine = None
+
+    def start(self):
+        """第一个订阅者到来时启动轮询线程（gunicorn 的 worker 在 fork 之后才会启动）"""
+        with self.condition:
+            if self.thread is not None:
+                return
+            with app.app_context():
+                self.engine = db.engines.get(READ_BIND, db.engine)
+            with self.engine.begin() as conn:
+                self.head = conn.execute(select(func.max(ChangeLog.seq))).scalar() or 0
+            self.floor = self.head
+            self.thread = threading.Thread(target=self.run, name='change-broker', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(app.config['EVENTS_POLL_INTERVAL'])
+            self.wakeup.clear()
+            generation = self.commits
+            try:
+                with self.engine.begin() as conn:
+                    changes, has_more = read_changes(conn.execute, self.head, EVENTS_BATCH_SIZE)
+                    for consumer in self.consumers:
+                        consumer(conn, changes, has_more, generation)
+            except Exception:
+                logger.exception('change broker poll failed')
+                continue
+            if changes:
+                self.publish(changes)
+            if has_more:
+                self.wakeup.set()
+
+    def publish(self, changes):
+        messages = []
+        for change in changes:
+            data = change.pop('data', None)
+            if change.pop('deleted'):
+                change['op'] = 'delete'
+            else:
+                change['op'] = 'create' if data and data['version'] == 1 else 'update'
+                change['data'] = data
+            messages.append((change['seq'], f"id: {change['seq']}\nevent: change\ndata: {app.json.dumps(change)}\n\n"))
+        with self.condition:
+            self.events.extend(messages)
+            self.head = messages[-1][0]
+            while len(self.events) > app.config['EVENTS_BUFFER_SIZE']:
+                self.floor = self.events.popleft()[0]
+            self.condition.notify_all()
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener()
+
+    def committed(self):
+        with self.condition:
+            self.commits += 1
+        self.wakeup.set()
+
+    def subscribe(self, cursor=None):
+        """返回订阅的起始游标，未指定时从当前位置开始"""
+        self.start()
+        with self.condition:
+            return self.head if cursor is None else cursor
+
+    def read(self, cursor):
+        """返回 (cursor 之后的消息列表, 新游标)；游标早于缓冲区时消息为 None，客户端应重新加载"""
+        with self.condition:
+            if cursor < self.floor:
+                return None, self.head
+            messages = [message for seq, message in self.events if seq > cursor]
+            return messages, max(cursor, self.head)
+
+    def add_listener(self, listener):
+        with self.condition:
+            self.listeners.add(listener)
+
+    def remove_listener(self, listener):
+        with self.condition:
+            self.listeners.discard(listener)
+
+    def wait(self, cursor, timeout):
+        with self.condition:
+            if self.head <= cursor:
+                self.condition.wait(timeout)
+        return self.read(cursor)
+
+broker = ChangeBroker()
+
+@event.listens_for(Session, 'after_commit')
+def wake_change_broker(session):
+    """本进程提交后立即推送，不必等到下一次轮询"""
+    broker.committed()
+
+def event_cursor(headers, args):
+    """断线重连时浏览器通过 Last-Event-ID 带回最后收到的 seq，也可用 ?since= 指定"""
+    return int_arg(headers, 'Last-Event-ID', int_arg(args, 'since'))
+
+EVENTS_RESET = 'event: reset\ndata: {}\n\n'
+
+def sse_headers():
+    return {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+@app.route('/events', methods=['GET'])
+def events():
+    """SSE 推送主数据项与数据项的增删改：event 为 change 时 data 为 {seq, type, id, item_id, op, data}，
+    op 为 create/update/delete，同一行在两次轮询之间的多次修改合并为一条（新建后即修改的行以 update 推送）；
+    event 为 reset 时客户端错过了部分变更，应重新加载列表"""
+    cursor = broker.subscribe(event_cursor(request.headers, request.args))
+
+    def generate(cursor):
+        yield 'retry: 3000\n\n'
+        while True:
+            messages, cursor = broker.wait(cursor, EVENTS_KEEPALIVE)
+            if messages is None:
+                yield EVENTS_RESET
+            elif messages:
+                yield ''.join(messages)
+            else:
+                yield ': keepalive\n\n'
+
+    return Response(generate(cursor), mimetype='text/event-stream', headers=sse_headers())
+
+# 内存快照（CATALOG_SNAPSHOT=1 时启用）：进程内保存全部主数据项与数据项，标记了 snapshot_read 的只读路由
+# 直接由快照应答，不访问数据库。行以 __slots__ 对象保存，主数据项 id 另存一份有序 array 供 after_id 翻页，
+# 代码与名称建哈希索引，数据项按 item_id 分组。快照由 ChangeBroker 的轮询线程维护：首次轮询时在同一读事务内
+# 全量加载，之后应用每次轮询读到的变更。快照尚未加载、还未包含本进程已提交的写入（提交后立即唤醒轮询），
+# 或超过 CATALOG_SNAPSHOT_MAX_LAG 秒未刷新时视为过期，请求回退到 SQL；其他进程的写入最迟一个轮询间隔后可见。
+app.config['CATALOG_SNAPSHOT'] = os.environ.get('CATALOG_SNAPSHOT', '').lower() in ('1', 'true', 'yes')
+app.config['CATALOG_SNAPSHOT_MAX_LAG'] = float(os.environ.get('CATALOG_SNAPSHOT_MAX_LAG', 5))
+
+TABLE_VERSIONS_STMT = select(TableVersion.name, TableVersion.version, TableVersion.updated_at)
+
+class SnapshotRow:
+    __slots__ = ()
+
+    def __init__(self, values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def size(self):
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, name)) for name in self.__slots__)
+
+class ItemRow(SnapshotRow):
+    __slots__ = CHANGE_ITEM_FIELDS
+
+class DataItemRow(SnapshotRow):
+    __slots__ = CHANGE_DATA_ITEM_FIELDS
+
+def index_add(index, key, row_id):
+    index[key] = index.get(key, ()) + (row_id,)
+
+def index_remove(index, key, row_id):
+    ids = tuple(other for other in index.get(key, ()) if other != row_id)
+    if ids:
+        index[key] = ids
+    else:
+        index.pop(key, None)
+
+class CatalogSnapshot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = False
+        self.loaded = False
+        self.generation = -1    # 已包含的本进程提交代数
+        self.refreshed = 0.0    # 最近一次刷新的 time.monotonic()
+        self.versions = {}      # 与快照内容同一事务读取的表版本号，供条件请求使用
+        self.items = {}         # id -> ItemRow
+        self.ids = array('q')   # 有序的主数据项 id
+        self.by_code = {}       # data_sources_code -> (id, ...)
+        self.by_name = {}       # data_sources_name -> (id, ...)
+        self.data_items = {}    # id -> DataItemRow
+        self.children = {}      # item_id -> {数据项 id: DataItemRow}
+        self.row_bytes = 0      # 各行及其字段值的 sys.getsizeof 之和，随增删累计
+
+    def start(self):
+        """首个可用快照的请求到来时挂到 ChangeBroker 上，由轮询线程加载（fork 之后才会启动线程）"""
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+            broker.consumers.append(self.consume)
+        try:
+            broker.start()
+        except Exception:
+            logger.exception('catalog snapshot start failed')
+            with self.lock:
+                self.started = False
+                broker.consumers.remove(self.consume)
+            return
+        broker.wakeup.set()
+
+    def fresh(self):
+        if not app.config['CATALOG_SNAPSHOT']:
+            return False
+        if not self.started:
+            self.start()
+        return (self.loaded and self.generation >= broker.commits
+                and time.monotonic() - self.refreshed <= app.config['CATALOG_SNAPSHOT_MAX_LAG'])
+
+    def consume(self, conn, changes, has_more, generation):
+        """ChangeBroker 轮询回调：首次全量加载，之后应用本次读到的变更。
+        本批之后还有变更时先不更新新鲜度，等下一次轮询（会立即进行）应用完为止"""
+        try:
+            versions = {name: (version, updated_at) for name, version, updated_at in conn.execute(TABLE_VERSIONS_STMT)}
+            if not self.loaded:
+                self.load(conn)
+            else:
+                self.apply(changes)
+                if has_more:
+                    return
+        except Exception:
+            logger.exception('catalog snapshot refresh failed')
+            self.loaded = False
+            return
+        self.versions = versions
+        self.generation = generation
+        self.refreshed = time.monotonic()
+
+    def load(self, conn):
+        items, by_code, by_name, row_bytes = {}, {}, {}, 0
+        for values in conn.execute(ITEM_ROW_STMT.order_by(Item.id)):
+            row = ItemRow(values)
+            items[row.id] = row
+            index_add(by_code, row.data_sources_code, row.id)
+            index_add(by_name, row.data_sources_name, row.id)
+            row_bytes += row.size()
+        data_items, children = {}, {}
+        for values in conn.execute(DATA_ITEM_ROW_STMT.order_by(DataItem.id)):
+            row = DataItemRow(values)
+            data_items[row.id] = row
+            children.setdefault(row.item_id, {})[row.id] = row
+            row_bytes += row.size()
+        with self.lock:
+            self.items, self.ids, self.by_code, self.by_name = items, array('q', items), by_code, by_name
+            self.data_items, self.children, self.row_bytes = data_items, children, row_bytes
+            self.loaded = True
+        logger.info('catalog snapshot loaded', extra={'fields': {'items': len(items), 'data_items': len(data_items)}})
+
+    def apply(self, changes):
+        """应用 read_changes 的结果：现存的行以当前值替换，已删除的行移除"""
+        with self.lock:
+            for change in changes:
+                data = change.get('data')
+                if change['type'] == 'item':
+                    self.remove_item(change['id'])
+                    if data is not None:
+                        self.put_item(ItemRow(data.values()))
+                else:
+                    self.remove_data_item(change['id'])
+                    if data is not None:
+                        self.put_data_item(DataItemRow(data.values()))
+
+    def put_item(self, row):
+        self.items[row.id] = row
+        self.row_bytes += row.size()
+        index = bisect_left(self.ids, row.id)
+        if index == len(self.ids) or self.ids[index] != row.id:
+            self.ids.insert(index, row.id)
+        index_add(self.by_code, row.data_sources_code, row.id)
+        index_add(self.by_name, row.data_sources_name, row.id)
+
+    def remove_item(self, item_id):
+        """移除主数据项的索引项；数据项由各自的删除记录移除（级联删除同样会记录）"""
+        row = self.items.pop(item_id, None)
+        if row is None:
+            return
+        self.row_bytes -= row.size()
+        index = bisect_left(self.ids, item_id)
+        if index < len(self.ids) and self.ids[index] == item_id:
+            del self.ids[index]
+        index_remove(self.by_code, row.data_sources_code, item_id)
+        index_remove(self.by_name, row.data_sources_name, item_id)
+
+    def put_data_item(self, row):
+        self.data_items[row.id] = row
+        self.row_bytes += row.size()
+        self.children.setdefault(row.item_id, {})[row.id] = row
+
+    def remove_data_item(self, data_item_id):
+        row = self.data_items.pop(data_item_id, None)
+        if row is None:
+            return
+        self.row_bytes -= row.size()
+        siblings = self.children.get(row.item_id)
+        if siblings is not None:
+            siblings.pop(data_item_id, None)
+            if not siblings:
+                del self.children[row.item_id]
+
+    def table_versions(self, tables):
+        """与 conditional 查询 table_version 的结果格式相同"""
+        return [(name, *self.versions[name]) for name in tables if name in self.versions]
+
+    def item_dict(self, row, keys, with_data_items):
+        item = {name: len(self.children.get(row.id, ())) if name == 'data_items_count' else getattr(row, name)
+                for name in keys}
+        if with_data_items:
+            item['data_items'] = self.child_dicts(row.id)
+        return item
+
+    def child_dicts(self, item_id):
+        children = self.children.get(item_id, {})
+        return [{name: getattr(children[child_id], name) for name in DATA_ITEM_FIELDS} for child_id in sorted(children)]
+
+    def item(self, item_id, keys, with_data_items):
+        """单个主数据项，不存在时返回 None"""
+        with self.lock:
+            row = self.items.get(item_id)
+            return None if row is None else self.item_dict(row, keys, with_data_items)
+
+    def page(self, after_id, limit, keys, with_data_items, filters):
+        """按 id 升序返回 after_id 之后满足 filters 的至多 limit + 1 个主数据项；
+        有代码或名称条件时从哈希索引取候选，否则顺序扫描有序 id"""
+        with self.lock:
+            candidates = None
+            for name, index in (('data_sources_code', self.by_code), ('data_sources_name', self.by_name)):
+                if name in filters:
+                    ids = set(index.get(filters[name], ()))
+                    candidates = ids if candidates is None else candidates & ids
+            start = -1 if after_id is None else after_id
+            if candidates is None:
+                ordered = (self.ids[i] for i in range(bisect_right(self.ids, start), len(self.ids)))
+            else:
+                ordered = sorted(item_id for item_id in candidates if item_id > start)
+            items = []
+            for item_id in ordered:
+                row = self.items[item_id]
+                if all(getattr(row, name) == value for name, value in filters.items()):
+                    items.append(self.item_dict(row, keys, with_data_items))
+                    if len(items) > limit:
+                        break
+            return items
+
+    def data_items_of(self, item_id):
+        """主数据项的全部数据项，主数据项不存在时返回 None"""
+        with self.lock:
+            return self.child_dicts(item_id) if item_id in self.items else None
+
+    def data_item(self, data_item_id):
+        with self.lock:
+            row = self.data_items.get(data_item_id)
+            return None if row is None else {name: getattr(row, name) for name in GET_DATA_ITEM_KEYS}
+
+    def report(self):
+        """更新行数、内存估算与刷新间隔指标。内存为各行（增删时累计）与各索引容器的 sys.getsizeof 之和，
+        锁内只复制容器引用，逐个计算在锁外进行"""
+        if not self.loaded:
+            return
+        with self.lock:
+            containers = [self.items, self.ids, self.by_code, self.by_name, self.data_items, self.children,
+                          *self.by_code.values(), *self.by_name.values(), *self.children.values()]
+            counts = (('item', len(self.items)), ('data_item', len(self.data_items)))
+            row_bytes = self.row_bytes
+        size = row_bytes + sum(map(sys.getsizeof, containers))
+        for table, count in counts:
+            metrics.set('catalog_snapshot_rows', (('type', table),), count)
+        metrics.set('catalog_snapshot_bytes', (), size)
+        metrics.set('catalog_snapshot_age_seconds', (), round(time.monotonic() - self.refreshed, 3))
+
+snapshot = CatalogSnapshot()
+metrics.collectors.append(snapshot.report)
+
+# 前端页面路由
+@app.route('/')
+def index():
+    """前端主页面"""
+    return render_compiled(INDEX_TEMPLATE, events_url=app.config['EVENTS_URL'])
+
+@app.route('/items/view/<int:item_id>')
+@read_only
+def view_item_page(item_id):
+    """查看数据项详情页面"""
+    item = db.get_or_404(Item, item_id, options=[joinedload(Item.data_items)])
+    return render_compiled(VIEW_TEMPLATE, item=item)
+
+# 批量导入命令：flask --app data import-items catalog.ndjson
+IMPORT_DATA_ITEM_COLUMNS = ('field_label_zh', 'field_label_en', 'field_type')
+
+def read_ndjson_records(path):
+    """逐行读取 NDJSON，产出 (行号, 主数据 dict)，无法解析的行以 ValueError 占位"""
+    with open(path, encoding='utf-8-sig') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, app.json.loads(line)
+            except ValueError as e:
+                yield line_no, ValueError(f'invalid JSON: {e}')
+
+def read_csv_records(path):
+    """读取 /items/export?format=csv 格式的 CSV：相邻且 id（缺省时为 data_sources_code）相同的行
+    合并为一个主数据项，产出 (该项最后一行的行号, 主数据 dict)。空单元格视为未提供"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        key, record, position = None, None, 0
+        for row in reader:
+            values = {name: value for name, value in row.items() if name and value not in (None, '')}
+            row_key = values.get('id') or values.get('data_sources_code')
+            if record is not None and (row_key is None or row_key != key):
+                yield position, record
+                record = None
+            if record is None:
+                key = row_key
+                record = {name: values[name] for name in ITEM_FIELDS if name != 'id' and name in values}
+                record['data_items'] = []
+            child = {name: values[name] for name in IMPORT_DATA_ITEM_COLUMNS if name in values}
+            if child:
+                record['data_items'].append(child)
+            position = reader.line_num
+        if record is not None:
+            yield position, record
+
+def save_import_checkpoint(conn, source, position, imported, rejected):
+    stmt = sqlite_insert(ImportCheckpoint).values(source=source, position=position, imported=imported, rejected=rejected)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[ImportCheckpoint.source],
+        set_={'position': position, 'imported': imported, 'rejected': rejected}
+    ))
+
+def truncate_rejects(path, position):
+    """续传前截掉断点之后写入的被拒绝行：上次中断时这些行可能已写入文件而所在批次未提交，续传会再次写入"""
+    try:
+        f = open(path, 'r+b')
+    except FileNotFoundError:
+        return
+    with f:
+        offset = 0
+        for line in f:
+            try:
+                if app.json.loads(line)['position'] > position:
+                    break
+            except (ValueError, KeyError, TypeError):
+                break
+            offset += len(line)
+        f.truncate(offset)
+
+@app.cli.command('import-items')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), help='文件格式，默认按扩展名判断')
+@click.option('--batch-size', default=1000, show_default=True, type=click.IntRange(min=1), help='每次提交的主数据项数')
+@click.option('--rejects', type=click.Path(dir_okay=False), help='被拒绝行的输出文件，默认 <PATH>.rejects.ndjson')
+@click.option('--restart', is_flag=True, help='忽略已有断点，从头导入')
+def import_items_command(path, file_format, batch_size, rejects, restart):
+    """从 CSV 或 NDJSON 文件批量导入主数据项及数据项。
+
+    校验规则与 POST /items 相同，每批数据与断点在同一事务内提交，
+    中断后再次执行同一命令会从最后提交的位置继续。"""
+    source = os.path.abspath(path)
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    records = read_csv_records(path) if file_format == 'csv' else read_ndjson_records(path)
+    rejects = rejects or f'{path}.rejects.ndjson'
+
+    with db.engine.connect() as conn:
+        checkpoint = None if restart else conn.execute(
+            select(ImportCheckpoint).where(ImportCheckpoint.source == source)).first()
+    start, imported, rejected = (checkpoint.position, checkpoint.imported, checkpoint.rejected) if checkpoint else (0, 0, 0)
+    if checkpoint:
+        click.echo(f'Resuming {path} after position {start} ({imported} imported, {rejected} rejected)')
+        truncate_rejects(rejects, start)
+
+    started = time.monotonic()
+    processed = 0
+    batch = []
+    batch_rejects = []
+    position = start
+    with open(rejects, 'a' if checkpoint else 'w', encoding='utf-8') as reject_file:
+        def commit_batch():
+            # 被拒绝行与本批数据、断点一起写入，中断于两者之间时由续传前的 truncate_rejects 截掉
+            nonlocal imported
+            reject_file.writelines(batch_rejects)
+            reject_file.flush()
+            with db.engine.begin() as conn:
+                imported += len(insert_items(conn, batch))
+                save_import_checkpoint(conn, source, position, imported, rejected)
+            batch.clear()
+            batch_rejects.clear()
+            rate = processed / max(time.monotonic() - started, 1e-6)
+            click.echo(f'{position}: {imported} imported, {rejected} rejected, {rate:.0f} rows/s')
+
+        for position, record in records:
+            if position <= start:
+                continue
+            processed += 1
+            error = str(record) if isinstance(record, ValueError) else validate_item(record)
+            if error:
+                rejected += 1
+                batch_rejects.append(app.json.dumps({
+                    'position': position,
+                    'error': error,
+                    'record': None if isinstance(record, ValueError) else record
+                }) + '\n')
+            else:
+                batch.append(record)
+            if len(batch) >= batch_size:
+                commit_batch()
+        if batch or batch_rejects:
+            commit_batch()
+
+    elapsed = time.monotonic() - started
+    click.echo(f'Done: {processed} rows in {elapsed:.1f}s, {imported} imported, {rejected} rejected'
+               + (f' (see {rejects})' if rejected else ''))
+
+# 生产服务入口：python data.py 以 gunicorn 预派生多进程、每进程多线程（gthread）运行；
+# --dev 使用 Flask 开发服务器。master 在 fork 前执行一次结构迁移并预加载应用与模板，
+# kill -HUP <master> 平滑重启全部 worker；更新代码时先发 USR2 启动新 master，再向旧 master 发 TERM。
+def post_fork(server, worker):
+    """fork 出的 worker 不能复用 master 的 SQLite 连接，丢弃继承来的连接池；日志线程与指标写出线程也需重新启动"""
+    start_log_listener()
+    metrics.start_flusher(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def worker_exit(server, worker):
+    metrics.stop_flusher(app.config['METRICS_DIR'])
+    stop_log_listener()
+
+def child_exit(server, worker):
+    """master 中调用（包括 worker 崩溃时），把退出的 worker 的计数器并入汇总"""
+    Metrics.retire(app.config['METRICS_DIR'], worker.pid)
+
+def prepare_metrics_dir():
+    """多进程指标目录：未指定时在临时目录中创建并在 master 退出时删除，已指定时清除上次运行留下的文件"""
+    directory = app.config['METRICS_DIR']
+    if not directory:
+        directory = app.config['METRICS_DIR'] = tempfile.mkdtemp(prefix='data-metrics-')
+        master = os.getpid()
+
+        def remove():
+            if os.getpid() == master:
+                shutil.rmtree(directory, ignore_errors=True)
+
+        atexit.register(remove)
+        return
+    os.makedirs(directory, exist_ok=True)
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.json'):
+            os.remove(entry.path)
+
+def serve(options):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit('gunicorn is not installed; install it or run with --dev')
+
+    class CatalogServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    CatalogServer().run()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='数据管理服务')
+    parser.add_argument('--dev', action='store_true', help='使用 Flask 开发服务器（调试模式）')
+    parser.add_argument('--bind', default=os.environ.get('BIND', '127.0.0.1:5000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', DEFAULT_THREADS)),
+                        help='每个 worker 的线程数')
+    parser.add_argument('--timeout', type=int, default=30, help='worker 无响应多少秒后被重启')
+    parser.add_argument('--graceful-timeout', type=int, default=30, help='重启时等待进行中请求的秒数')
+    parser.add_argument('--keep-alive', type=int, default=5, help='HTTP keep-alive 秒数')
+    parser.add_argument('--max-requests', type=int, default=0, help='worker 处理多少请求后自动轮换，0 为不轮换')
+    parser.add_argument('--pid', help='master 进程的 pid 文件')
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        applied = migrate()
+        logger.info('database migrated', extra={'fields': {
+            'applied_migrations': applied,
+            'tables': inspect(db.engine).get_table_names()
+        }})
+        for engine in db.engines.values():
+            engine.dispose()
+
+    if args.dev:
+        app.run(debug=True)
+        return
+    app.config['ADMISSION_BUDGETS'] = admission_budgets(args.threads)
+    error = check_admission_budgets(args.threads)
+    if error:
+        raise SystemExit(error)
+    prepare_metrics_dir()
+    serve({
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'keepalive': args.keep_alive,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests // 10,
+        'preload_app': True,
+        'pidfile': args.pid,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+        'child_exit': child_exit
+    })
+
+if __name__ == '__main__':
+    main()